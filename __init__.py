@@ -1,7 +1,7 @@
 # Segmind API Python Client
 # Version: 1.0.0
 
-from segmind_api import SegmindAPI
+from segmind_api import SegmindAPI, SegmindRateLimitError, LazyImage
 from segmind_models import (
     SDXL,
     SDOutpainting,
@@ -14,7 +14,8 @@ from segmind_models import (
     ControlNet,
     Veo3,
     FluxKontextPro,
-    LLaVA13B
+    LLaVA13B,
+    batch_generate
 )
 
 # For backward compatibility with the original segmind-py package
@@ -25,6 +26,8 @@ ERSGAN = BackgroundRemoval  # Alias for BackgroundRemoval
 
 __all__ = [
     'SegmindAPI',
+    'SegmindRateLimitError',
+    'LazyImage',
     'SDXL',
     'SDOutpainting',
     'QRGenerator',
@@ -37,6 +40,7 @@ __all__ = [
     'Veo3',
     'FluxKontextPro',
     'LLaVA13B',
+    'batch_generate',
     # Aliases
     'SD2_1',
     'Kadinsky',
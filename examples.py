@@ -1,7 +1,9 @@
 import os
 import time
 import random
+import requests
 # Import directly from the local modules
+from segmind_api import SegmindRateLimitError
 from segmind_models import (
     SDXL,
     SDOutpainting,
@@ -91,39 +93,65 @@ def example_veo3():
     return video_data
 
 
-def run_with_backoff(func, max_retries=5, initial_delay=1):
+def run_with_backoff(func, max_retries=5, initial_delay=1, max_delay=60):
     """
-    Run a function with exponential backoff for handling rate limit errors.
+    Run a function with exponential backoff for handling rate limit and network errors.
+    
+    SegmindAPI already retries rate limits and transient server errors on the
+    connection pool; this covers whatever still escapes, such as a rate limit
+    that outlasted those retries or a dropped connection.
+    
+    Uses "full jitter": each wait is drawn uniformly between 0 and the exponential
+    delay, so concurrent clients spread out their retries instead of retrying in
+    lockstep. A Retry-After header from the server is always honored.
     
     Args:
         func: The function to run
         max_retries: Maximum number of retry attempts
         initial_delay: Initial delay in seconds before retrying
+        max_delay: Upper bound in seconds for the exponential delay
         
     Returns:
         The result of the function if successful
     """
-    retries = 0
-    delay = initial_delay
-    
-    while retries <= max_retries:
+    for attempt in range(max_retries + 1):
         try:
             return func()
-        except Exception as e:
-            error_message = str(e)
-            if "429" in error_message and retries < max_retries:
-                # Rate limit error, implement backoff
-                jitter = random.uniform(0, 0.1) * delay  # Add some randomness to the delay
-                wait_time = delay + jitter
-                print(f"Rate limit exceeded. Retrying in {wait_time:.2f} seconds... (Attempt {retries+1}/{max_retries})")
-                time.sleep(wait_time)
-                delay *= 2  # Exponential backoff
-                retries += 1
-            else:
-                # Other error or max retries reached
-                raise e
+        except (SegmindRateLimitError, requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+            if attempt == max_retries:
+                raise
+            backoff = random.uniform(0, min(max_delay, initial_delay * 2 ** attempt))
+            wait_time = max(getattr(e, 'retry_after', None) or 0, backoff)
+            print(f"{e}. Retrying in {wait_time:.2f} seconds... (Attempt {attempt+1}/{max_retries})")
+            time.sleep(wait_time)
+
+
+async def run_all_async():
+    """Example of generating several images concurrently with AsyncSegmindAPI."""
+    # Requires the optional aiohttp dependency: pip install -e .[async]
+    from segmind_async import AsyncSegmindAPI
+    from segmind_utils import save_image
+    
+    print("\n=== Running Async SDXL Example ===")
+    prompts = [
+        "A beautiful landscape with mountains at sunrise, photorealistic, 4k",
+        "A futuristic city skyline at night, neon lights, 4k",
+        "A cozy cabin in a snowy forest, warm light, 4k",
+    ]
+    async with AsyncSegmindAPI(API_KEY or None) as api:
+        images = await api.gather([(api.sdxl, {"prompt": prompt, "seed": 42}) for prompt in prompts])
+    
+    for i, image in enumerate(images):
+        save_image(image, f"output/sdxl_async_{i}.jpg")
+    print(f"{len(images)} images generated concurrently and saved to 'output/'")
+    return images
+
+
+def example_async():
+    """Run the async example from synchronous code."""
+    import asyncio
     
-    raise Exception(f"Failed after {max_retries} retries")
+    return asyncio.run(run_all_async())
 
 
 def run_examples():
@@ -143,10 +171,11 @@ def run_examples():
         # run_with_backoff(example_background_removal)
         # run_with_backoff(example_llava_13b)
         # run_with_backoff(example_veo_3)
+        # run_with_backoff(example_async)
         
         print("\nAll examples completed successfully!")
     except Exception as e:
-        if "429" in str(e):
+        if isinstance(e, SegmindRateLimitError):
             print("\nError: Rate limit exceeded (429 Too Many Requests)")
             print("The Segmind API is currently rate limiting your requests.")
             print("Please wait a while before trying again or check your API key's quota.")
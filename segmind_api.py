@@ -1,8 +1,328 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import encode_multipart_formdata
+from urllib3.util.retry import Retry
 import os
 import io
-from PIL import Image
-import base64
+import re
+import gzip
+import inspect
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import segmind_cache
+from segmind_utils import _STREAM_CHUNK_SIZE, _b64encode, _upload_binary, detect_image_mime, image_path_to_base64, save_image, save_image_async, save_video
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the stdlib json module
+    orjson = None
+
+if orjson is not None:
+    _json_dumps = orjson.dumps
+    _json_loads = orjson.loads
+else:
+    def _json_dumps(obj):
+        return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    _json_loads = json.loads
+
+# Index tag starting each answer of a batched LLaVA prompt, e.g. "[3] ..."
+_BATCH_ANSWER_TAG = re.compile(r'^\s*\[(\d+)\]\s*', re.MULTILINE)
+
+
+
+class SegmindRateLimitError(Exception):
+    """
+    Raised when the Segmind API rejects a request with 429 Too Many Requests.
+    
+    Args:
+        message (str): The error message.
+        retry_after (float, optional): Seconds the server asked to wait before retrying, if it sent a Retry-After header.
+    """
+    
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_retry_after(value):
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date.
+    
+    Args:
+        value (str): The header value.
+        
+    Returns:
+        float: The number of seconds to wait, or None if the header is missing or invalid.
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _message_text(response):
+    """
+    Extract the reply text from a LLaVA 13B response.
+    
+    Args:
+        response: The handled API response (dict, str or bytes).
+        
+    Returns:
+        str: The text of the model's reply.
+    """
+    if isinstance(response, bytes):
+        return response.decode('utf-8')
+    if isinstance(response, dict):
+        if response.get('choices'):
+            return response['choices'][0]['message']['content']
+        if 'content' in response:
+            return response['content']
+    return str(response)
+
+
+def _batch_prompt(conversations):
+    """
+    Build a single prompt asking every conversation's last message, tagged by index.
+    
+    Args:
+        conversations (list): List of message lists.
+        
+    Returns:
+        str: The batched prompt.
+    """
+    questions = "\n".join(f"[{i}] {conversation[-1]['content']}" for i, conversation in enumerate(conversations))
+    return (
+        f"Answer each of the following {len(conversations)} questions independently. "
+        "Start every answer on a new line with the index tag of its question, e.g. [0].\n\n"
+        f"{questions}"
+    )
+
+
+def _split_batch_reply(reply, count):
+    """
+    Split the reply to a batched prompt back into per-question answers.
+    
+    Args:
+        reply (str): The model's reply text.
+        count (int): The number of questions in the batch.
+        
+    Returns:
+        list: The answer for each question, or None where no tagged answer was found.
+    """
+    answers = [None] * count
+    tags = list(_BATCH_ANSWER_TAG.finditer(reply))
+    for tag, next_tag in zip(tags, tags[1:] + [None]):
+        index = int(tag.group(1))
+        end = next_tag.start() if next_tag else len(reply)
+        if index < count and answers[index] is None:
+            answers[index] = reply[tag.end():end].strip()
+    return answers
+
+
+def _open_image(content):
+    """
+    Open encoded image bytes as a PIL Image. Pixel data is decoded on first access.
+    
+    PIL is imported here rather than at module level, as it is only needed for
+    image responses.
+    
+    Args:
+        content (bytes): The encoded image.
+        
+    Returns:
+        PIL.Image.Image: The opened image.
+    """
+    from PIL import Image
+    
+    return Image.open(io.BytesIO(content))
+
+
+def _decode_image(content):
+    """
+    Fully decode encoded image bytes.
+    
+    Args:
+        content (bytes): The encoded image.
+        
+    Returns:
+        PIL.Image.Image: The decoded image.
+    """
+    image = _open_image(content)
+    image.load()
+    return image
+
+
+class LazyImage:
+    """
+    An image response that is decoded on a background thread.
+    
+    The caller gets control back as soon as the response arrives and can issue
+    the next request while the image decodes. Attribute access such as save(),
+    size or convert() is delegated to the decoded PIL Image, waiting for the
+    decode to finish if needed.
+    
+    Args:
+        content (bytes): The encoded image bytes.
+        executor (concurrent.futures.Executor): The executor to decode on.
+    """
+    
+    def __init__(self, content, executor):
+        self.content = content
+        self._future = executor.submit(_decode_image, content)
+    
+    @property
+    def image(self):
+        """
+        PIL.Image.Image: The decoded image, waiting for the decode to finish if needed.
+        """
+        return self._future.result()
+    
+    def __getattr__(self, name):
+        if name.startswith('__') or name == '_future':
+            raise AttributeError(name)
+        return getattr(self.image, name)
+
+
+class _HTTPXResponse:
+    """
+    Adapts an httpx.Response to the parts of the requests.Response interface used by SegmindAPI.
+    
+    Args:
+        response (httpx.Response): The response to wrap.
+    """
+    
+    def __init__(self, response):
+        self._response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+    
+    @property
+    def content(self):
+        return self._response.read()
+    
+    def iter_content(self, chunk_size=None):
+        return self._response.iter_bytes(chunk_size)
+    
+    def close(self):
+        self._response.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class HTTP2Transport:
+    """
+    An httpx-backed HTTP/2 transport, used by SegmindAPI in place of a requests.Session.
+    Concurrent requests are multiplexed over a single TLS connection.
+    Requires the optional httpx[http2] dependency.
+    
+    Args:
+        headers (dict): Headers sent with every request.
+    """
+    
+    def __init__(self, headers):
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("The httpx transport requires httpx[http2]. Install it with: pip install -e .[http2]")
+        self._httpx = httpx
+        self._client = httpx.Client(
+            http2=True,
+            headers=headers,
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=128),
+            timeout=httpx.Timeout(120.0, connect=5.0)
+        )
+        self.headers = self._client.headers
+    
+    def post(self, url, data=None, headers=None, timeout=None, stream=False):
+        """
+        Send a POST request.
+        
+        Args:
+            url (str): The endpoint URL.
+            data (bytes, optional): The body of the request.
+            headers (dict, optional): Extra headers for this request.
+            timeout (tuple, optional): (connect, read) timeouts in seconds.
+            stream (bool, optional): Whether to defer downloading the response body.
+            
+        Returns:
+            _HTTPXResponse: The response.
+        """
+        if timeout is not None:
+            timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+            request = self._client.build_request('POST', url, content=data, headers=headers, timeout=timeout)
+        else:
+            request = self._client.build_request('POST', url, content=data, headers=headers)
+        return _HTTPXResponse(self._client.send(request, stream=stream))
+    
+    def close(self):
+        self._client.close()
+
+
+def _image_model(model_name, doc, param=None, send_as=None):
+    """
+    Build a SegmindAPI method that wraps image_to_image for one model endpoint.
+    
+    The generated method takes image_url, image_path and image_base64 as its first
+    positional parameters, then the model's extra parameter if it has one, then image_bytes.
+    
+    Args:
+        model_name (str): The endpoint name of the model.
+        doc (str): The docstring of the generated method.
+        param (str, optional): Name of the model's extra parameter, e.g. 'prompt'.
+            It is only sent when set.
+        send_as (str, optional): Request field the extra parameter is sent as, if it
+            differs from param, e.g. 'mask' for 'mask_url'.
+        
+    Returns:
+        function: The generated method.
+    """
+    name = model_name.replace('-', '_')
+    
+    if param is None:
+        def method(self, image_url=None, image_path=None, image_base64=None, image_bytes=None, **kwargs):
+            return self.image_to_image(model_name,
+                                       image_url=image_url,
+                                       image_path=image_path,
+                                       image_base64=image_base64,
+                                       image_bytes=image_bytes,
+                                       **self._clean(kwargs))
+    else:
+        def method(self, image_url=None, image_path=None, image_base64=None, extra=None, image_bytes=None, **kwargs):
+            # extra holds the positional value of param; it may also be passed by name
+            if param in kwargs:
+                if extra is not None:
+                    raise TypeError(f"{name}() got multiple values for argument '{param}'")
+                extra = kwargs.pop(param)
+            kwargs[send_as or param] = extra
+            return self.image_to_image(model_name,
+                                       image_url=image_url,
+                                       image_path=image_path,
+                                       image_base64=image_base64,
+                                       image_bytes=image_bytes,
+                                       **self._clean(kwargs))
+        signature = inspect.signature(method)
+        method.__signature__ = signature.replace(parameters=[
+            parameter.replace(name=param) if parameter.name == 'extra' else parameter
+            for parameter in signature.parameters.values()
+        ])
+    method.__name__ = name
+    method.__qualname__ = f"SegmindAPI.{name}"
+    method.__doc__ = doc
+    return method
+
 
 class SegmindAPI:
     """
@@ -11,11 +331,47 @@ class SegmindAPI:
     
     Args:
         api_key (str): Your Segmind API key. If not provided, it will look for SEGMIND_API_KEY environment variable.
+        transport (str, optional): HTTP transport to use: "requests" (HTTP/1.1 keep-alive pool, default)
+            or "httpx" (HTTP/2 multiplexing, requires httpx[http2]).
+        max_retries (int, optional): Number of times the requests transport retries connection errors,
+            rate limits (429) and transient server errors (5xx), with exponential backoff and Retry-After support.
+        compress_requests (bool, optional): Gzip request bodies larger than COMPRESS_THRESHOLD bytes
+            (e.g. ones embedding base64 images). Only enable this if the endpoint accepts Content-Encoding: gzip.
+        lazy_decode (bool, optional): Return image responses as LazyImage objects that decode in the
+            background, instead of PIL Images.
+        background_saves (bool, optional): Write images requested with save_path on a background thread,
+            so the call returns without waiting for the disk. Use segmind_utils.wait_for_saves() to wait
+            for pending writes; they are also flushed at interpreter exit.
     """
     
     BASE_URL = "https://api.segmind.com/v1/"
     
-    def __init__(self, api_key=None):
+    # (connect, read) timeouts in seconds
+    TIMEOUT = (5, 120)
+    # Video generation can take many minutes before the response starts, so it has no read timeout
+    VIDEO_TIMEOUT = (5, None)
+    
+    TRANSPORTS = ('requests', 'httpx')
+    
+    # Number of hosts and keep-alive connections per host kept by the requests connection pool
+    POOL_CONNECTIONS = 16
+    POOL_MAXSIZE = 64
+    
+    # Status codes retried by the connection pool
+    RETRY_STATUSES = (429, 500, 502, 503, 504)
+    
+    # Minimum body size in bytes worth compressing when compress_requests is enabled
+    COMPRESS_THRESHOLD = 8192
+    
+    def __init__(self, api_key=None, transport='requests', max_retries=5, compress_requests=False, lazy_decode=False,
+                 background_saves=False):
+        if transport not in self.TRANSPORTS:
+            raise ValueError(f"transport must be one of {self.TRANSPORTS}, got {transport!r}.")
+        self.transport = transport
+        self.max_retries = max_retries
+        self.compress_requests = compress_requests
+        self.lazy_decode = lazy_decode
+        self.background_saves = background_saves
         self.api_key = api_key or os.environ.get("SEGMIND_API_KEY")
         if not self.api_key:
             raise ValueError("API key must be provided either as an argument or as SEGMIND_API_KEY environment variable.")
@@ -23,35 +379,200 @@ class SegmindAPI:
             'x-api-key': self.api_key,
             'Content-Type': 'application/json'
         }
+        
+        # Endpoint URLs, built once per model name
+        self._endpoints = {}
+        # Prepared request templates and send settings, built once per endpoint URL
+        self._prepared = {}
+        # Encodes uploads and decodes responses off the request-issuing thread, see _worker_pool
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._session = self._create_session()
     
-    def _handle_response(self, response):
+    @property
+    def _worker_pool(self):
+        """
+        ThreadPoolExecutor: The pool that encodes uploads and decodes responses off the
+        request-issuing thread. It is created on first use, and again after close(),
+        so a closed client can still be reused.
+        """
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=4)
+        return self._pool
+    
+    def _shutdown_worker_pool(self):
+        """
+        Shut down the worker pool, if it was created. Work already submitted still completes.
+        """
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False)
+    
+    def _create_session(self):
+        """
+        Create the HTTP session shared by all calls of this client.
+        
+        Returns:
+            requests.Session or HTTP2Transport: A session with a keep-alive connection pool.
+        """
+        if self.transport == 'httpx':
+            return HTTP2Transport(self.headers)
+        
+        # Retries happen inside urllib3 on the pooled connection. POST is allowed
+        # because generations are safe to repeat; the last response is returned
+        # rather than raised, so _handle_response reports the final error.
+        # Read errors are not retried: the server may already be generating,
+        # and every resubmission would be billed again.
+        retry = Retry(
+            total=self.max_retries,
+            read=False,
+            backoff_factor=1.0,
+            status_forcelist=self.RETRY_STATUSES,
+            allowed_methods=frozenset(['POST']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        session = requests.Session()
+        session.headers.update(self.headers)
+        adapter = HTTPAdapter(pool_connections=self.POOL_CONNECTIONS, pool_maxsize=self.POOL_MAXSIZE, max_retries=retry)
+        session.mount('https://', adapter)
+        return session
+    
+    def close(self):
+        """
+        Close the underlying HTTP session and release pooled connections.
+        """
+        self._shutdown_worker_pool()
+        self._session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+    
+    def _encode_body(self, params, files=None):
+        """
+        Serialize request parameters into a request body.
+        
+        Args:
+            params (dict): The JSON parameters for the request.
+            files (dict, optional): Binary uploads keyed by field name, as bytes or binary file objects.
+                When given, the request is sent as multipart/form-data instead of JSON.
+            
+        Returns:
+            tuple: The body bytes and the extra headers to send with it (or None).
+        """
+        if files:
+            fields = {k: v if isinstance(v, str) else _json_dumps(v).decode('utf-8') for k, v in params.items()}
+            for name, data in files.items():
+                if hasattr(data, 'read'):
+                    data = data.read()
+                fields[name] = (name, data, detect_image_mime(data[:12]) or 'application/octet-stream')
+            body, content_type = encode_multipart_formdata(fields)
+            return body, {'Content-Type': content_type}
+        
+        body = _json_dumps(params)
+        if self.compress_requests and len(body) > self.COMPRESS_THRESHOLD:
+            # Level 3 keeps most of the size reduction at a fraction of the default level's CPU cost
+            return gzip.compress(body, compresslevel=3), {'Content-Encoding': 'gzip'}
+        return body, None
+    
+    def _post(self, url, params, stream=False, files=None, timeout=None):
+        """
+        Send a POST request with JSON parameters over the shared session.
+        
+        The body is serialized with orjson when it is installed, instead of
+        letting requests use the slower stdlib json module. With the requests
+        transport, the request for each endpoint is prepared once and only its
+        body is swapped per call.
+        
+        Args:
+            url (str): The endpoint URL.
+            params (dict): The JSON parameters for the request.
+            stream (bool, optional): Whether to defer downloading the response body.
+            files (dict, optional): Binary uploads to send as multipart/form-data, see _encode_body.
+            timeout (tuple, optional): (connect, read) timeouts in seconds. Defaults to TIMEOUT.
+            
+        Returns:
+            requests.Response: The raw response object.
+        """
+        timeout = timeout or self.TIMEOUT
+        body, headers = self._encode_body(params, files)
+        if self.transport != 'requests':
+            return self._session.post(url, data=body, headers=headers, timeout=timeout, stream=stream)
+        
+        prepared = self._prepared.get(url)
+        if prepared is None:
+            template = self._session.prepare_request(requests.Request('POST', url))
+            settings = self._session.merge_environment_settings(url, {}, None, None, None)
+            prepared = self._prepared[url] = (template, settings)
+        template, settings = prepared
+        
+        request = template.copy()
+        request.body = body
+        request.headers['Content-Length'] = str(len(body))
+        if headers:
+            request.headers.update(headers)
+        return self._session.send(request, timeout=timeout, **dict(settings, stream=stream))
+    
+    def _raise_for_error(self, response):
+        """
+        Raise an exception describing a failed API response.
+        
+        Args:
+            response (requests.Response): The response object from the API request.
+            
+        Raises:
+            SegmindRateLimitError: If the request was rate limited (status code 429).
+            Exception: For any other error status code.
+        """
+        error_message = f"API request failed with status code {response.status_code}"
+        try:
+            error_data = _json_loads(response.content)
+            if 'error' in error_data:
+                error_message += f": {error_data['error']}"
+        except ValueError:
+            pass
+        if response.status_code == 429:
+            raise SegmindRateLimitError(error_message, _parse_retry_after(response.headers.get('Retry-After')))
+        raise Exception(error_message)
+    
+    def _handle_response(self, response, raw=False, save_path=None):
         """
         Handle API response and check for errors.
         
         Args:
             response (requests.Response): The response object from the API request.
+            raw (bool, optional): Return the response bytes as-is instead of decoding them.
+            save_path (str, optional): Path to save an image response to. If its extension
+                matches the returned image format, the bytes are written without re-encoding.
             
         Returns:
             The response content or raises an exception if there's an error.
         """
-        if response.status_code == 200:
-            # Check if the response is an image
-            if response.headers.get('Content-Type', '').startswith('image/'):
-                return Image.open(io.BytesIO(response.content))
-            # Check if the response is JSON
-            try:
-                return response.json()
-            except ValueError:
-                return response.content
-        else:
-            error_message = f"API request failed with status code {response.status_code}"
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    error_message += f": {error_data['error']}"
-            except ValueError:
-                pass
-            raise Exception(error_message)
+        if response.status_code != 200:
+            self._raise_for_error(response)
+        
+        # Dispatch on the media type alone, ignoring parameters such as charset
+        content_type = response.headers.get('Content-Type', '').partition(';')[0].strip()
+        content = response.content
+        if content_type.startswith('image/'):
+            if save_path and self.background_saves:
+                save_image_async(content, save_path)
+            elif save_path:
+                save_image(content, save_path)
+            if raw:
+                return content
+            if self.lazy_decode:
+                return LazyImage(content, self._worker_pool)
+            return _open_image(content)
+        if content_type == 'application/json' and not raw:
+            return _json_loads(content)
+        return content
     
     def get_remaining_credits(self, response):
         """
@@ -65,53 +586,225 @@ class SegmindAPI:
         """
         return response.headers.get('x-remaining-credits')
     
-    def text_to_image(self, model_name, **params):
+    @staticmethod
+    def _clean(params):
         """
-        Generate an image from a text prompt using the specified model.
+        Drop parameters that were not set.
+        
+        Args:
+            params (dict): The request parameters.
+            
+        Returns:
+            dict: The parameters whose value is not None.
+        """
+        return {k: v for k, v in params.items() if v is not None}
+    
+    def _url(self, model_name):
+        """
+        Get the endpoint URL for a model.
+        
+        Args:
+            model_name (str): The name of the model.
+            
+        Returns:
+            str: The full endpoint URL.
+        """
+        url = self._endpoints.get(model_name)
+        if url is None:
+            url = self._endpoints[model_name] = f"{self.BASE_URL}{model_name}"
+        return url
+    
+    def _call(self, model_name, params, raw=False, save_path=None, files=None):
+        """
+        Post parameters to a model endpoint and handle the response.
         
         Args:
             model_name (str): The name of the model to use.
-            **params: Additional parameters for the model.
+            params (dict): The JSON parameters for the request.
+            raw (bool, optional): Return the response bytes as-is instead of decoding them.
+            save_path (str, optional): Path to save an image response to.
+            files (dict, optional): Binary uploads to send as multipart/form-data, see _encode_body.
             
         Returns:
-            PIL.Image.Image: The generated image.
+            The handled response content.
         """
-        url = f"{self.BASE_URL}{model_name}"
-        response = requests.post(url, json=params, headers=self.headers)
-        return self._handle_response(response)
+        url = self._url(model_name)
+        if files is None and segmind_cache.enabled():
+            # Identical requests are answered from disk, see segmind_cache
+            response = segmind_cache.cached_post(self._post, url, params)
+        else:
+            response = self._post(url, params, files=files)
+        return self._handle_response(response, raw=raw, save_path=save_path)
     
-    def image_to_image(self, model_name, image_url=None, image_path=None, image_base64=None, **params):
+    def text_to_image(self, model_name, raw_bytes=False, save_path=None, **params):
         """
-        Generate an image from another image using the specified model.
+        Generate an image from a text prompt using the specified model.
         
         Args:
             model_name (str): The name of the model to use.
+            raw_bytes (bool, optional): Return the encoded image bytes instead of a decoded PIL Image.
+            save_path (str, optional): Path to save the generated image to. When its extension matches
+                the format returned by the API, the bytes are written without re-encoding.
+            **params: Additional parameters for the model (e.g. an output format option, where the model supports one).
+            
+        Returns:
+            PIL.Image.Image: The generated image, or bytes if raw_bytes is True.
+        """
+        return self._call(model_name, params, raw=raw_bytes, save_path=save_path)
+    
+    def _image_params(self, params, image_url=None, image_path=None, image_base64=None, image_bytes=None):
+        """
+        Validate the image inputs and add the chosen one to the request parameters.
+        
+        Args:
+            params (dict): The request parameters to update.
             image_url (str, optional): URL of the input image.
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
-            **params: Additional parameters for the model.
+            image_bytes (bytes or file, optional): Encoded image data, uploaded separately as a multipart file.
             
         Returns:
-            PIL.Image.Image: The generated image.
+            dict: The updated request parameters.
         """
-        if sum(x is not None for x in [image_url, image_path, image_base64]) != 1:
-            raise ValueError("Exactly one of image_url, image_path, or image_base64 must be provided.")
-        
-        url = f"{self.BASE_URL}{model_name}"
+        if sum(x is not None for x in [image_url, image_path, image_base64, image_bytes]) != 1:
+            raise ValueError("Exactly one of image_url, image_path, image_base64, or image_bytes must be provided.")
         
         if image_url:
             params['image'] = image_url
-            response = requests.post(url, json=params, headers=self.headers)
         elif image_path:
-            with open(image_path, 'rb') as img_file:
-                img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            params['image'] = f"data:image/jpeg;base64,{img_data}"
-            response = requests.post(url, json=params, headers=self.headers)
+            params['image'] = image_path_to_base64(image_path)
         elif image_base64:
             params['image'] = image_base64
-            response = requests.post(url, json=params, headers=self.headers)
+        return params
+    
+    def image_to_image(self, model_name, image_url=None, image_path=None, image_base64=None, raw_bytes=False, save_path=None, image_bytes=None, **params):
+        """
+        Generate an image from another image using the specified model.
+        
+        Args:
+            model_name (str): The name of the model to use.
+            image_url (str, optional): URL of the input image.
+            image_path (str, optional): Path to the input image file.
+            image_base64 (str, optional): Base64-encoded image data.
+            image_bytes (bytes or file, optional): Encoded image data or a binary file object. The request is
+                sent as multipart/form-data with the image as a binary part, avoiding the base64 encode and its
+                33% size overhead. Only use this with endpoints that accept multipart uploads.
+            raw_bytes (bool, optional): Return the encoded image bytes instead of a decoded PIL Image.
+            save_path (str, optional): Path to save the generated image to. When its extension matches
+                the format returned by the API, the bytes are written without re-encoding.
+            **params: Additional parameters for the model (e.g. an output format option, where the model supports one).
+            
+        Returns:
+            PIL.Image.Image: The generated image, or bytes if raw_bytes is True.
+        """
+        params = self._image_params(params, image_url, image_path, image_base64, image_bytes)
+        files = {'image': image_bytes} if image_bytes is not None else None
+        return self._call(model_name, params, raw=raw_bytes, save_path=save_path, files=files)
+    
+    def _prep_image(self, image_path):
+        """
+        Start encoding a local image file in the background.
+        
+        Args:
+            image_path (str): The path to the image file.
+            
+        Returns:
+            concurrent.futures.Future: Resolves to the data URL of the image.
+        """
+        return self._worker_pool.submit(image_path_to_base64, image_path)
+    
+    def _prep_binary(self, image_path):
+        """
+        Start reading a local image file for a binary upload in the background.
+        
+        Args:
+            image_path (str): The path to the image file.
+            
+        Returns:
+            concurrent.futures.Future: Resolves to the file contents.
+        """
+        return self._worker_pool.submit(_upload_binary, image_path)
+    
+    def _prep_pipeline_images(self, steps):
+        """
+        Start encoding the local image files of all pipeline steps, so that encoding
+        overlaps with the network time of earlier steps.
+        
+        Args:
+            steps (list): The pipeline steps.
+            
+        Returns:
+            dict: Futures resolving to data URLs, keyed by step index.
+        """
+        return {i: self._prep_image(step['image_path'])
+                for i, step in enumerate(steps) if step.get('image_path') is not None}
+    
+    def _pipeline_params(self, step, outputs, encoded_image=None):
+        """
+        Build the model name and request parameters for one pipeline step.
+        
+        Args:
+            step (dict): The pipeline step.
+            outputs (list): (content_type, content) of the previous steps.
+            encoded_image (str, optional): The already encoded data URL of the step's image_path.
+            
+        Returns:
+            tuple: The model name and the request parameters.
+        """
+        params = dict(step)
+        model_name = params.pop('model')
+        if encoded_image is not None:
+            del params['image_path']
+            params['image_base64'] = encoded_image
+        source = params.pop('image_from', None)
+        if source is not None:
+            content_type, content = outputs[source]
+            if not content_type.startswith('image/'):
+                raise ValueError(f"Pipeline step {source} did not return an image (Content-Type: {content_type}).")
+            params['image_base64'] = f"data:{content_type};base64,{_b64encode(content).decode('ascii')}"
         
-        return self._handle_response(response)
+        image_inputs = {key: params.pop(key) for key in ('image_url', 'image_path', 'image_base64') if key in params}
+        if image_inputs:
+            params = self._image_params(params, **image_inputs)
+        return model_name, params
+    
+    def pipeline(self, steps):
+        """
+        Run several model calls in sequence, feeding images from earlier steps into later ones.
+        
+        Intermediate images are passed on as the raw bytes returned by the API,
+        without being decoded and re-encoded.
+        
+        Args:
+            steps (list): List of step dicts. Each has a 'model' key with the endpoint name,
+                optionally an 'image_from' key with the index of an earlier step whose image
+                is used as input, and any other parameters for the model.
+                Example: [
+                    {"model": "background-removal", "image_url": "https://example.com/image.jpg"},
+                    {"model": "codeformer", "image_from": 0}
+                ]
+            
+        Returns:
+            The result of the last step.
+            
+        Raises:
+            ValueError: If steps is empty.
+        """
+        if not steps:
+            raise ValueError("A pipeline needs at least one step.")
+        prepared = self._prep_pipeline_images(steps)
+        outputs = []
+        for i, step in enumerate(steps):
+            encoded_image = prepared[i].result() if i in prepared else None
+            model_name, params = self._pipeline_params(step, outputs, encoded_image)
+            if i == len(steps) - 1:
+                return self._call(model_name, params)
+            response = self._post(self._url(model_name), params)
+            if response.status_code != 200:
+                self._raise_for_error(response)
+            # Keep the media type alone, so parameters such as charset stay out of the data URL
+            content_type = response.headers.get('Content-Type', '').partition(';')[0].strip()
+            outputs.append((content_type, response.content))
     
     # Specific model implementations
     
@@ -131,21 +824,18 @@ class SegmindAPI:
         Returns:
             PIL.Image.Image: The generated image.
         """
-        params = {
+        params = self._clean({
             'prompt': prompt,
             'base64': base64,
-            **{k: v for k, v in {
-                'negative_prompt': negative_prompt,
-                'steps': steps,
-                'seed': seed,
-                'aspect_ratio': aspect_ratio,
-            }.items() if v is not None},
+            'negative_prompt': negative_prompt,
+            'steps': steps,
+            'seed': seed,
+            'aspect_ratio': aspect_ratio,
             **kwargs
-        }
+        })
         return self.text_to_image('sdxl1.0-txt2img', **params)
     
-    def sd_outpainting(self, image_url=None, image_path=None, image_base64=None, prompt=None, **kwargs):
-        """
+    sd_outpainting = _image_model('sd-outpainting', param='prompt', doc="""
         Extend an image beyond its original boundaries using Stable Diffusion Outpainting.
         
         Args:
@@ -153,21 +843,12 @@ class SegmindAPI:
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
             prompt (str, optional): Text prompt to guide the outpainting.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The outpainted image.
-        """
-        params = {}
-        if prompt:
-            params['prompt'] = prompt
-        params.update(kwargs)
-        
-        return self.image_to_image('sd-outpainting', 
-                                  image_url=image_url, 
-                                  image_path=image_path, 
-                                  image_base64=image_base64, 
-                                  **params)
+        """)
     
     def qr_generator(self, prompt, qr_text, **kwargs):
         """
@@ -181,15 +862,9 @@ class SegmindAPI:
         Returns:
             PIL.Image.Image: The generated QR code image.
         """
-        params = {
-            'prompt': prompt,
-            'qr_text': qr_text,
-            **kwargs
-        }
-        return self.text_to_image('qr-code-generator', **params)
+        return self.text_to_image('qr-code-generator', prompt=prompt, qr_text=qr_text, **kwargs)
     
-    def word2img(self, image_url=None, image_path=None, image_base64=None, prompt=None, **kwargs):
-        """
+    word2img = _image_model('word2img', param='prompt', doc="""
         Transform an image based on a text prompt.
         
         Args:
@@ -197,81 +872,56 @@ class SegmindAPI:
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
             prompt (str, optional): Text prompt to guide the transformation.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The transformed image.
-        """
-        params = {}
-        if prompt:
-            params['prompt'] = prompt
-        params.update(kwargs)
-        
-        return self.image_to_image('word2img', 
-                                  image_url=image_url, 
-                                  image_path=image_path, 
-                                  image_base64=image_base64, 
-                                  **params)
+        """)
     
-    def background_removal(self, image_url=None, image_path=None, image_base64=None, **kwargs):
-        """
+    background_removal = _image_model('background-removal', doc="""
         Remove the background from an image.
         
         Args:
             image_url (str, optional): URL of the input image.
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The image with background removed.
-        """
-        return self.image_to_image('background-removal', 
-                                 image_url=image_url, 
-                                 image_path=image_path, 
-                                 image_base64=image_base64, 
-                                 **kwargs)
+        """)
     
-    def codeformer(self, image_url=None, image_path=None, image_base64=None, **kwargs):
-        """
+    codeformer = _image_model('codeformer', doc="""
         Restore and enhance faces in images.
         
         Args:
             image_url (str, optional): URL of the input image.
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The image with enhanced faces.
-        """
-        return self.image_to_image('codeformer', 
-                                 image_url=image_url, 
-                                 image_path=image_path, 
-                                 image_base64=image_base64, 
-                                 **kwargs)
+        """)
     
-    def sam(self, image_url=None, image_path=None, image_base64=None, **kwargs):
-        """
+    sam = _image_model('sam', doc="""
         Segment objects in an image using Segment Anything Model (SAM).
         
         Args:
             image_url (str, optional): URL of the input image.
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The segmented image.
-        """
-        return self.image_to_image('sam', 
-                                 image_url=image_url, 
-                                 image_path=image_path, 
-                                 image_base64=image_base64, 
-                                 **kwargs)
+        """)
     
-    def face_swap(self, image_url=None, image_path=None, image_base64=None, mask_url=None, **kwargs):
-        """
+    face_swap = _image_model('face-swap', param='mask_url', send_as='mask', doc="""
         Swap faces in images.
         
         Args:
@@ -279,23 +929,14 @@ class SegmindAPI:
             image_path (str, optional): Path to the input image file.
             image_base64 (str, optional): Base64-encoded image data.
             mask_url (str): URL of the mask image containing the face to swap.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The image with swapped faces.
-        """
-        params = {}
-        if mask_url:
-            params['mask'] = mask_url
-        params.update(kwargs)
-        
-        return self.image_to_image('face-swap', 
-                                  image_url=image_url, 
-                                  image_path=image_path, 
-                                  image_base64=image_base64, 
-                                  **params)
+        """)
     
-    def controlnet(self, prompt, image_url=None, image_path=None, image_base64=None, option="canny", **kwargs):
+    def controlnet(self, prompt, image_url=None, image_path=None, image_base64=None, option="canny", image_bytes=None, **kwargs):
         """
         Generate images guided by control maps using ControlNet.
         
@@ -305,58 +946,48 @@ class SegmindAPI:
             image_path (str, optional): Path to the input control image file.
             image_base64 (str, optional): Base64-encoded control image data.
             option (str, optional): ControlNet option (canny, depth, openpose, scribble, softedge).
+            image_bytes (bytes or file, optional): Encoded control image data to upload as multipart/form-data.
             **kwargs: Additional parameters for the model.
             
         Returns:
             PIL.Image.Image: The generated image.
         """
-        params = {
-            'prompt': prompt,
-            'option': option,
-            **kwargs
-        }
-        
         return self.image_to_image('controlnet', 
                                   image_url=image_url, 
                                   image_path=image_path, 
                                   image_base64=image_base64, 
-                                  **params)
+                                  image_bytes=image_bytes,
+                                  prompt=prompt,
+                                  option=option,
+                                  **kwargs)
     
-    def veo_3(self, prompt, seed=None, **kwargs):
+    def veo_3(self, prompt, seed=None, save_path=None, **kwargs):
         """
         Generate video from text using Google's Veo 3 model.
         
         Args:
             prompt (str): The text prompt describing the video content.
             seed (int, optional): Random seed for reproducibility.
+            save_path (str, optional): Path to stream the generated video to, instead of returning it in memory.
             **kwargs: Additional parameters for the model.
             
         Returns:
-            bytes: The generated video data.
+            bytes: The generated video data if save_path is None, otherwise the path where the video was saved.
         """
-        params = {
-            'prompt': prompt,
-            **{k: v for k, v in {'seed': seed}.items() if v is not None},
-            **kwargs
-        }
-        
-        url = f"{self.BASE_URL}veo-3"
-        response = requests.post(url, json=params, headers=self.headers)
+        params = self._clean({'prompt': prompt, 'seed': seed, **kwargs})
         
+        url = self._url('veo-3')
         # For video, we return the raw content instead of trying to parse it
-        if response.status_code == 200:
-            return response.content
-        else:
-            error_message = f"API request failed with status code {response.status_code}"
-            try:
-                error_data = response.json()
-                if 'error' in error_data:
-                    error_message += f": {error_data['error']}"
-            except ValueError:
-                pass
-            raise Exception(error_message)
+        with self._post(url, params, stream=True, timeout=self.VIDEO_TIMEOUT) as response:
+            if response.status_code != 200:
+                self._raise_for_error(response)
+            if not save_path:
+                return response.content
+            
+            # Write chunks to disk as they arrive so memory use stays constant
+            return save_video(response.iter_content(chunk_size=_STREAM_CHUNK_SIZE), save_path)
     
-    def flux_kontext_pro(self, prompt, input_image=None, seed=1, aspect_ratio="match_input_image", **kwargs):
+    def flux_kontext_pro(self, prompt, input_image=None, seed=1, aspect_ratio="match_input_image", raw_bytes=False, save_path=None, **kwargs):
         """
         Transform images based on text prompts using FLUX.1 Kontext Pro.
         
@@ -365,24 +996,22 @@ class SegmindAPI:
             input_image (str, optional): URL of the input image.
             seed (int, optional): Random seed for reproducibility.
             aspect_ratio (str, optional): Aspect ratio of the output image.
+            raw_bytes (bool, optional): Return the encoded image bytes instead of a decoded PIL Image.
+            save_path (str, optional): Path to save the transformed image to.
             **kwargs: Additional parameters for the model.
             
         Returns:
-            PIL.Image.Image: The transformed image.
+            PIL.Image.Image: The transformed image, or bytes if raw_bytes is True.
         """
-        params = {
+        params = self._clean({
             'prompt': prompt,
             'seed': seed,
             'aspect_ratio': aspect_ratio,
+            'input_image': input_image,
             **kwargs
-        }
-        
-        if input_image:
-            params['input_image'] = input_image
+        })
         
-        url = f"{self.BASE_URL}flux-kontext-pro"
-        response = requests.post(url, json=params, headers=self.headers)
-        return self._handle_response(response)
+        return self._call('flux-kontext-pro', params, raw=raw_bytes, save_path=save_path)
     
     def llava_13b(self, messages):
         """
@@ -403,6 +1032,29 @@ class SegmindAPI:
             'messages': messages
         }
         
-        url = f"{self.BASE_URL}llava-13b"
-        response = requests.post(url, json=params, headers=self.headers)
-        return self._handle_response(response)
\ No newline at end of file
+        return self._call('llava-13b', params)
+    
+    def llava_13b_batch(self, conversations):
+        """
+        Answer several independent LLaVA 13B prompts with a single API call.
+        
+        The last user message of each conversation is tagged with its index and all
+        of them are sent together; the reply is split back on those tags. Earlier
+        messages of each conversation are not included in the batched prompt. Any
+        answer missing from the reply is fetched with its own llava_13b call.
+        
+        Args:
+            conversations (list): List of message lists, as accepted by llava_13b.
+            
+        Returns:
+            list: The answer text for each conversation, in the same order.
+        """
+        if not conversations:
+            return []
+        
+        reply = _message_text(self.llava_13b([{"role": "user", "content": _batch_prompt(conversations)}]))
+        answers = _split_batch_reply(reply, len(conversations))
+        for i, answer in enumerate(answers):
+            if not answer:
+                answers[i] = _message_text(self.llava_13b(conversations[i]))
+        return answers
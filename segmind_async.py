@@ -0,0 +1,309 @@
+import asyncio
+from concurrent.futures import Future
+
+try:
+    import aiohttp
+except ImportError:  # aiohttp is optional when the httpx transport is used
+    aiohttp = None
+
+from segmind_api import SegmindAPI, _batch_prompt, _message_text, _split_batch_reply
+from segmind_utils import _STREAM_CHUNK_SIZE, _open_for_write
+
+
+class _AsyncResponse:
+    """
+    Minimal response object holding a fully read aiohttp or httpx response, so that
+    SegmindAPI._handle_response can be reused unchanged.
+
+    Args:
+        status_code (int): The HTTP status code.
+        headers (Mapping): The case-insensitive response headers.
+        content (bytes): The response body.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+class AsyncSegmindAPI(SegmindAPI):
+    """
+    An asyncio client for the Segmind API.
+    Every model method of SegmindAPI is available and returns an awaitable, so
+    many calls can be in flight at once over a single session.
+
+    Args:
+        api_key (str): Your Segmind API key. If not provided, it will look for SEGMIND_API_KEY environment variable.
+        max_concurrency (int, optional): Maximum number of requests in flight at the same time.
+        compress_requests (bool, optional): Gzip large request bodies, as in SegmindAPI.
+        lazy_decode (bool, optional): Return LazyImage objects, as in SegmindAPI.
+        background_saves (bool, optional): Write images requested with save_path on a background thread,
+            as in SegmindAPI.
+        transport (str, optional): HTTP transport to use: "aiohttp" (HTTP/1.1 keep-alive pool, default,
+            requires aiohttp) or "httpx" (HTTP/2, multiplexing all concurrent requests over one
+            connection, requires httpx[http2]).
+
+    Unlike SegmindAPI, requests are not retried automatically.
+    """
+
+    TRANSPORTS = ('aiohttp', 'httpx')
+
+    def __init__(self, api_key=None, max_concurrency=32, compress_requests=False, transport='aiohttp', lazy_decode=False,
+                 background_saves=False):
+        super().__init__(api_key, transport=transport, compress_requests=compress_requests, lazy_decode=lazy_decode,
+                         background_saves=background_saves)
+        self.max_concurrency = max_concurrency
+        self._async_session = None
+        self._semaphore = None
+
+    def _create_session(self):
+        # The async session is created lazily inside the running event loop
+        return None
+
+    def _get_session(self):
+        if self._async_session is None:
+            if self.transport == 'httpx':
+                self._async_session = self._create_httpx_client()
+            else:
+                if aiohttp is None:
+                    raise ImportError("The aiohttp transport requires aiohttp. Install it with: pip install -e .[async]")
+                connector = aiohttp.TCPConnector(limit=64, limit_per_host=32, keepalive_timeout=60)
+                self._async_session = aiohttp.ClientSession(connector=connector, headers=self.headers)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_session
+
+    def _create_httpx_client(self):
+        """
+        Create an HTTP/2 httpx client.
+
+        Returns:
+            httpx.AsyncClient: The client.
+        """
+        try:
+            import httpx
+        except ImportError:
+            raise ImportError("The httpx transport requires httpx[http2]. Install it with: pip install -e .[http2]")
+        return httpx.AsyncClient(
+            http2=True,
+            headers=self.headers,
+            limits=httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency),
+            timeout=httpx.Timeout(self.TIMEOUT[1], connect=self.TIMEOUT[0])
+        )
+
+    async def close(self):
+        """
+        Close the underlying session and release pooled connections.
+        The client can be reused afterwards; a new session is opened on the next request.
+        """
+        self._shutdown_worker_pool()
+        if self._async_session is not None:
+            if self.transport == 'httpx':
+                await self._async_session.aclose()
+            else:
+                await self._async_session.close()
+            self._async_session = None
+
+    def __enter__(self):
+        raise TypeError("AsyncSegmindAPI must be used with 'async with', not 'with'")
+
+    async def __aenter__(self):
+        self._get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    def _timeout(self, timeout):
+        """
+        Convert (connect, read) timeouts to the timeout object of the transport.
+
+        Args:
+            timeout (tuple): (connect, read) timeouts in seconds. A read timeout of None waits indefinitely.
+
+        Returns:
+            aiohttp.ClientTimeout or httpx.Timeout: The timeout for one request.
+        """
+        if self.transport == 'httpx':
+            # Only called once the client exists, so httpx is installed
+            import httpx
+            return httpx.Timeout(timeout[1], connect=timeout[0])
+        return aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+
+    async def _post(self, url, params, files=None, timeout=None):
+        """
+        Send a POST request with JSON parameters over the shared session.
+
+        Args:
+            url (str): The endpoint URL.
+            params (dict): The JSON parameters for the request.
+            files (dict, optional): Binary uploads to send as multipart/form-data, see SegmindAPI._encode_body.
+            timeout (tuple, optional): (connect, read) timeouts in seconds. Defaults to TIMEOUT.
+
+        Returns:
+            _AsyncResponse: The fully read response.
+        """
+        session = self._get_session()
+        body, headers = self._encode_body(params, files)
+        timeout = self._timeout(timeout or self.TIMEOUT)
+        async with self._semaphore:
+            if self.transport == 'httpx':
+                resp = await session.post(url, content=body, headers=headers, timeout=timeout)
+                return _AsyncResponse(resp.status_code, resp.headers, resp.content)
+            async with session.post(url, data=body, headers=headers, timeout=timeout) as resp:
+                content = await resp.read()
+                return _AsyncResponse(resp.status, resp.headers, content)
+
+    async def _post_to_file(self, url, params, save_path, timeout=None):
+        """
+        Send a POST request and stream the response body to a file as it arrives.
+
+        Args:
+            url (str): The endpoint URL.
+            params (dict): The JSON parameters for the request.
+            save_path (str): Path to write the response body to.
+            timeout (tuple, optional): (connect, read) timeouts in seconds. Defaults to TIMEOUT.
+
+        Returns:
+            str: The path where the response body was saved.
+        """
+        session = self._get_session()
+        body, headers = self._encode_body(params)
+        timeout = self._timeout(timeout or self.TIMEOUT)
+        async with self._semaphore:
+            if self.transport == 'httpx':
+                async with session.stream('POST', url, content=body, headers=headers, timeout=timeout) as resp:
+                    if resp.status_code != 200:
+                        self._raise_for_error(_AsyncResponse(resp.status_code, resp.headers, await resp.aread()))
+                    with _open_for_write(save_path) as f:
+                        async for chunk in resp.aiter_bytes(_STREAM_CHUNK_SIZE):
+                            f.write(chunk)
+                return save_path
+            async with session.post(url, data=body, headers=headers, timeout=timeout) as resp:
+                if resp.status != 200:
+                    self._raise_for_error(_AsyncResponse(resp.status, resp.headers, await resp.read()))
+                with _open_for_write(save_path) as f:
+                    async for chunk in resp.content.iter_chunked(_STREAM_CHUNK_SIZE):
+                        f.write(chunk)
+        return save_path
+
+    async def _call(self, model_name, params, raw=False, save_path=None, files=None):
+        response = await self._post(self._url(model_name), params, files)
+        # Saving and decoding images touches the disk and the CPU, so it runs on the worker pool
+        return await asyncio.wrap_future(self._worker_pool.submit(self._handle_response, response, raw, save_path))
+
+    async def image_to_image(self, model_name, image_url=None, image_path=None, image_base64=None, raw_bytes=False, save_path=None, image_bytes=None, **params):
+        """
+        Generate an image from another image using the specified model.
+
+        A local image_path is read and encoded on a worker thread, and the response
+        is decoded and saved on one, so the event loop keeps dispatching other
+        requests meanwhile.
+
+        Args:
+            model_name (str): The name of the model to use.
+            image_url (str, optional): URL of the input image.
+            image_path (str, optional): Path to the input image file.
+            image_base64 (str, optional): Base64-encoded image data.
+            image_bytes (bytes or file, optional): Encoded image data to upload as multipart/form-data,
+                or a concurrent.futures.Future resolving to it, see SegmindAPI._prep_binary.
+            raw_bytes (bool, optional): Return the encoded image bytes instead of a decoded PIL Image.
+            save_path (str, optional): Path to save the generated image to.
+            **params: Additional parameters for the model.
+
+        Returns:
+            PIL.Image.Image: The generated image, or bytes if raw_bytes is True.
+        """
+        if image_path is not None and image_url is None and image_base64 is None and image_bytes is None:
+            image_path, image_base64 = None, await asyncio.wrap_future(self._prep_image(image_path))
+        if isinstance(image_bytes, Future):
+            image_bytes = await asyncio.wrap_future(image_bytes)
+        params = self._image_params(params, image_url, image_path, image_base64, image_bytes)
+        files = {'image': image_bytes} if image_bytes is not None else None
+        return await self._call(model_name, params, raw=raw_bytes, save_path=save_path, files=files)
+
+    async def veo_3(self, prompt, seed=None, save_path=None, **kwargs):
+        """
+        Generate video from text using Google's Veo 3 model.
+
+        Args:
+            prompt (str): The text prompt describing the video content.
+            seed (int, optional): Random seed for reproducibility.
+            save_path (str, optional): Path to stream the generated video to, instead of returning it in memory.
+            **kwargs: Additional parameters for the model.
+
+        Returns:
+            bytes: The generated video data if save_path is None, otherwise the path where the video was saved.
+        """
+        params = self._clean({'prompt': prompt, 'seed': seed, **kwargs})
+
+        if not save_path:
+            response = await self._post(self._url('veo-3'), params, timeout=self.VIDEO_TIMEOUT)
+            if response.status_code == 200:
+                return response.content
+            self._raise_for_error(response)
+
+        return await self._post_to_file(self._url('veo-3'), params, save_path, timeout=self.VIDEO_TIMEOUT)
+
+    async def llava_13b_batch(self, conversations):
+        """
+        Answer several independent LLaVA 13B prompts with a single API call.
+
+        Args:
+            conversations (list): List of message lists, as accepted by llava_13b.
+
+        Returns:
+            list: The answer text for each conversation, in the same order.
+        """
+        if not conversations:
+            return []
+
+        reply = _message_text(await self.llava_13b([{"role": "user", "content": _batch_prompt(conversations)}]))
+        answers = _split_batch_reply(reply, len(conversations))
+        missing = [i for i, answer in enumerate(answers) if not answer]
+        retried = await asyncio.gather(*(self.llava_13b(conversations[i]) for i in missing))
+        for i, response in zip(missing, retried):
+            answers[i] = _message_text(response)
+        return answers
+
+    async def pipeline(self, steps):
+        """
+        Run several model calls in sequence, feeding images from earlier steps into later ones.
+
+        Args:
+            steps (list): List of step dicts, as accepted by SegmindAPI.pipeline.
+
+        Returns:
+            The result of the last step.
+
+        Raises:
+            ValueError: If steps is empty.
+        """
+        if not steps:
+            raise ValueError("A pipeline needs at least one step.")
+        prepared = self._prep_pipeline_images(steps)
+        outputs = []
+        for i, step in enumerate(steps):
+            encoded_image = await asyncio.wrap_future(prepared[i]) if i in prepared else None
+            model_name, params = self._pipeline_params(step, outputs, encoded_image)
+            if i == len(steps) - 1:
+                return await self._call(model_name, params)
+            response = await self._post(self._url(model_name), params)
+            if response.status_code != 200:
+                self._raise_for_error(response)
+            # Keep the media type alone, so parameters such as charset stay out of the data URL
+            content_type = response.headers.get('Content-Type', '').partition(';')[0].strip()
+            outputs.append((content_type, response.content))
+
+    async def gather(self, calls, return_exceptions=False):
+        """
+        Run several API calls concurrently.
+
+        Args:
+            calls (list): List of (method, kwargs) tuples, e.g. [(api.sdxl, {"prompt": "a cat"})].
+            return_exceptions (bool, optional): Whether to return exceptions as results instead of raising the first one.
+
+        Returns:
+            list: The results in the same order as the calls.
+        """
+        return await asyncio.gather(*(fn(**kw) for fn, kw in calls), return_exceptions=return_exceptions)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+# Set SEGMIND_CACHE=1 to enable the cache
+ENV_ENABLED = "SEGMIND_CACHE"
+# Optional cache directory, defaults to ~/.cache/segmind
+ENV_DIR = "SEGMIND_CACHE_DIR"
+# Optional maximum age of cached responses in seconds
+ENV_TTL = "SEGMIND_CACHE_TTL"
+
+
+class CachedResponse:
+    """
+    A response read back from the cache, with the attributes of requests.Response
+    used by SegmindAPI._handle_response.
+
+    Args:
+        status_code (int): The HTTP status code.
+        headers (dict): The cached response headers.
+        content (bytes): The response body.
+    """
+
+    def __init__(self, status_code, headers, content):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+
+
+def enabled():
+    """
+    Check whether the response cache is enabled.
+
+    Returns:
+        bool: True if the SEGMIND_CACHE environment variable is set to 1.
+    """
+    return os.environ.get(ENV_ENABLED) == "1"
+
+
+def cache_dir():
+    """
+    Get the directory holding cached responses.
+
+    Returns:
+        str: The cache directory.
+    """
+    return os.environ.get(ENV_DIR) or os.path.join(os.path.expanduser("~"), ".cache", "segmind")
+
+
+def cache_key(url, params):
+    """
+    Compute the cache key of a request.
+
+    Parameters are serialized with sorted keys, so the key does not depend on
+    the order in which they were passed.
+
+    Args:
+        url (str): The endpoint URL.
+        params (dict): The JSON parameters for the request.
+
+    Returns:
+        str: The hex digest identifying the request.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(url.encode("utf-8"))
+    hasher.update(b"\0")
+    hasher.update(json.dumps(params, sort_keys=True, separators=(",", ":")).encode("utf-8"))
+    return hasher.hexdigest()
+
+
+def load(key, ttl=None):
+    """
+    Read a cached response.
+
+    Args:
+        key (str): The cache key of the request.
+        ttl (float, optional): Maximum age in seconds of a usable entry. If None, entries never expire.
+
+    Returns:
+        CachedResponse: The cached response, or None if there is no usable entry.
+    """
+    base = os.path.join(cache_dir(), key)
+    try:
+        with open(base + ".meta.json", "r") as f:
+            meta = json.load(f)
+        if ttl is not None and time.time() - meta["created"] > ttl:
+            return None
+        with open(base + ".bin", "rb") as f:
+            content = f.read()
+    except (OSError, ValueError, KeyError):
+        return None
+    return CachedResponse(meta["status_code"], meta["headers"], content)
+
+
+def _write_atomic(path, data):
+    """
+    Write a file so that readers never see it partially written.
+
+    Args:
+        path (str): The destination path.
+        data (bytes): The file contents.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def store(key, response):
+    """
+    Cache a response.
+
+    The body is written before its metadata, so an entry only becomes visible
+    to load() once it is complete.
+
+    Args:
+        key (str): The cache key of the request.
+        response (requests.Response): The response to cache.
+    """
+    directory = cache_dir()
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, key)
+    meta = {
+        "status_code": response.status_code,
+        "headers": {"Content-Type": response.headers.get("Content-Type", "")},
+        "created": time.time()
+    }
+    _write_atomic(base + ".bin", response.content)
+    _write_atomic(base + ".meta.json", json.dumps(meta).encode("utf-8"))
+
+
+def cached_post(post, url, params, ttl=None):
+    """
+    Send a POST request, answering it from the cache when an identical request was cached before.
+
+    Only successful (200) responses are cached.
+
+    Args:
+        post (callable): Sends the request, called as post(url, params) on a cache miss.
+        url (str): The endpoint URL.
+        params (dict): The JSON parameters for the request.
+        ttl (float, optional): Maximum age in seconds of a usable entry. If None, the
+            SEGMIND_CACHE_TTL environment variable is used; if that is unset, entries never expire.
+
+    Returns:
+        requests.Response or CachedResponse: The response.
+    """
+    if ttl is None and os.environ.get(ENV_TTL):
+        ttl = float(os.environ[ENV_TTL])
+    key = cache_key(url, params)
+    response = load(key, ttl)
+    if response is not None:
+        return response
+
+    response = post(url, params)
+    if response.status_code == 200:
+        try:
+            store(key, response)
+        except OSError:
+            # A cache that cannot be written must not fail the request
+            pass
+    return response
@@ -1,5 +1,6 @@
+import copy
 from segmind_api import SegmindAPI
-from segmind_utils import load_image_from_path, load_image_from_url, image_to_base64, save_image, save_video
+from segmind_utils import _upload_binary, image_path_to_base64
 
 class ModelBase:
     """
@@ -7,10 +8,107 @@ class ModelBase:
     
     Args:
         api_key (str): Your Segmind API key.
+        binary_upload (bool, optional): Upload local image files as multipart/form-data binary parts
+            instead of base64 JSON fields. Only enable this for endpoints that accept multipart uploads.
+        api (SegmindAPI, optional): An existing client to send requests with. Sharing one client between
+            models lets them reuse its keep-alive connection pool. If given, api_key is ignored.
+        async_transport (str, optional): The AsyncSegmindAPI transport used by agenerate, 'aiohttp'
+            (default) or 'httpx' for a single multiplexed HTTP/2 connection.
     """
     
-    def __init__(self, api_key=None):
-        self.api = SegmindAPI(api_key)
+    # Set on the agenerate view, whose async client reads and encodes image files itself
+    _defer_image_encoding = False
+    
+    def __init__(self, api_key=None, binary_upload=False, api=None, async_transport='aiohttp'):
+        self.api = api if api is not None else SegmindAPI(api_key)
+        self.binary_upload = binary_upload
+        self.async_transport = async_transport
+        self._async_api = None
+    
+    def _create_async_api(self):
+        """
+        Create an asyncio client with the same settings as the synchronous one,
+        on the transport chosen by async_transport.
+        
+        Returns:
+            AsyncSegmindAPI: The new client.
+        """
+        from segmind_async import AsyncSegmindAPI
+        return AsyncSegmindAPI(self.api.api_key, compress_requests=self.api.compress_requests,
+                               transport=self.async_transport, lazy_decode=self.api.lazy_decode,
+                               background_saves=self.api.background_saves)
+    
+    async def __aenter__(self):
+        if self._async_api is None:
+            self._async_api = self._create_async_api()
+        return self
+    
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
+    
+    async def agenerate(self, *args, **kwargs):
+        """
+        Asynchronous version of generate.
+        
+        Inside "async with model:" concurrent calls share one session, so many
+        generations can be in flight at once. Outside of it, each call opens its
+        own client and closes it before returning, so agenerate can be awaited
+        from any event loop, e.g. from repeated asyncio.run calls.
+        
+        Args:
+            *args: Positional arguments, as accepted by generate.
+            **kwargs: Keyword arguments, as accepted by generate.
+            
+        Returns:
+            The result of generate.
+        """
+        api = self._async_api
+        owned = api is None
+        if owned:
+            api = self._create_async_api()
+        # generate() returns the API method's result, which is an awaitable on the async client
+        view = copy.copy(self)
+        view.api = api
+        view._defer_image_encoding = True
+        try:
+            return await view.generate(*args, **kwargs)
+        finally:
+            if owned:
+                await api.close()
+    
+    async def aclose(self):
+        """
+        Close the asyncio client shared by agenerate calls, if one is open.
+        """
+        if self._async_api is not None:
+            await self._async_api.close()
+            self._async_api = None
+    
+    def _image_kwargs(self, image_path, image_url):
+        """
+        Get the API arguments for the input image of a generate call.
+        
+        A local image_path is only used when no image_url is given. It is uploaded
+        as binary when binary_upload is set, and as cached base64 otherwise. From
+        agenerate the file is read or encoded on the async client's worker pool.
+        
+        Args:
+            image_path (str): Path to the input image file, or None.
+            image_url (str): URL of the input image, or None.
+            
+        Returns:
+            dict: One of {'image_url': ...}, {'image_path': ...}, {'image_base64': ...} or {'image_bytes': ...}.
+        """
+        if not image_path or image_url:
+            return {'image_url': image_url}
+        if self._defer_image_encoding:
+            # The async client reads and encodes the file on its worker pool, off the event loop
+            if self.binary_upload:
+                return {'image_bytes': self.api._prep_binary(image_path)}
+            return {'image_path': image_path}
+        if self.binary_upload:
+            return {'image_bytes': _upload_binary(image_path)}
+        return {'image_base64': image_path_to_base64(image_path)}
 
 
 class SDXL(ModelBase):
@@ -37,24 +135,8 @@ class SDXL(ModelBase):
         Returns:
             PIL.Image.Image: The generated image.
         """
-        params = {
-            'prompt': prompt,
-            'negative_prompt': negative_prompt,
-            'steps': steps,
-            'seed': seed,
-            **kwargs
-        }
-        
-        # Only add aspect_ratio if it's not None
-        if aspect_ratio is not None:
-            params['aspect_ratio'] = aspect_ratio
-            
-        image = self.api.sdxl(**params)
-        
-        if save_path:
-            save_image(image, save_path)
-        
-        return image
+        # SegmindAPI.sdxl drops unset parameters itself, so forward everything as-is
+        return self.api.sdxl(prompt, negative_prompt, steps, seed, aspect_ratio, save_path=save_path, **kwargs)
 
 
 class SDOutpainting(ModelBase):
@@ -79,18 +161,7 @@ class SDOutpainting(ModelBase):
         Returns:
             PIL.Image.Image: The outpainted image.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.sd_outpainting(prompt=prompt, image_base64=image_base64, **kwargs)
-        else:
-            result = self.api.sd_outpainting(prompt=prompt, image_url=image_url, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.sd_outpainting(prompt=prompt, **self._image_kwargs(image_path, image_url), save_path=save_path, **kwargs)
 
 
 class QRGenerator(ModelBase):
@@ -114,10 +185,7 @@ class QRGenerator(ModelBase):
         Returns:
             PIL.Image.Image: The generated QR code image.
         """
-        result = self.api.qr_generator(prompt=prompt, qr_text=qr_text, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
+        result = self.api.qr_generator(prompt=prompt, qr_text=qr_text, save_path=save_path, **kwargs)
         
         return result
 
@@ -144,18 +212,7 @@ class Word2Img(ModelBase):
         Returns:
             PIL.Image.Image: The transformed image.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.word2img(prompt=prompt, image_base64=image_base64, **kwargs)
-        else:
-            result = self.api.word2img(prompt=prompt, image_url=image_url, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.word2img(prompt=prompt, **self._image_kwargs(image_path, image_url), save_path=save_path, **kwargs)
 
 
 class BackgroundRemoval(ModelBase):
@@ -179,18 +236,7 @@ class BackgroundRemoval(ModelBase):
         Returns:
             PIL.Image.Image: The image with background removed.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.background_removal(image_base64=image_base64, **kwargs)
-        else:
-            result = self.api.background_removal(image_url=image_url, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.background_removal(**self._image_kwargs(image_path, image_url), save_path=save_path, **kwargs)
 
 
 class Codeformer(ModelBase):
@@ -214,18 +260,7 @@ class Codeformer(ModelBase):
         Returns:
             PIL.Image.Image: The image with enhanced faces.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.codeformer(image_base64=image_base64, **kwargs)
-        else:
-            result = self.api.codeformer(image_url=image_url, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.codeformer(**self._image_kwargs(image_path, image_url), save_path=save_path, **kwargs)
 
 
 class SAM(ModelBase):
@@ -249,18 +284,7 @@ class SAM(ModelBase):
         Returns:
             PIL.Image.Image: The segmented image.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.sam(image_base64=image_base64, **kwargs)
-        else:
-            result = self.api.sam(image_url=image_url, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.sam(**self._image_kwargs(image_path, image_url), save_path=save_path, **kwargs)
 
 
 class FaceSwap(ModelBase):
@@ -285,18 +309,7 @@ class FaceSwap(ModelBase):
         Returns:
             PIL.Image.Image: The image with swapped faces.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.face_swap(image_base64=image_base64, mask_url=mask_url, **kwargs)
-        else:
-            result = self.api.face_swap(image_url=image_url, mask_url=mask_url, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.face_swap(**self._image_kwargs(image_path, image_url), mask_url=mask_url, save_path=save_path, **kwargs)
 
 
 class ControlNet(ModelBase):
@@ -322,18 +335,7 @@ class ControlNet(ModelBase):
         Returns:
             PIL.Image.Image: The generated image.
         """
-        if image_path and not image_url:
-            # Convert local image to base64
-            image = load_image_from_path(image_path)
-            image_base64 = image_to_base64(image)
-            result = self.api.controlnet(prompt=prompt, image_base64=image_base64, option=option, **kwargs)
-        else:
-            result = self.api.controlnet(prompt=prompt, image_url=image_url, option=option, **kwargs)
-        
-        if save_path:
-            save_image(result, save_path)
-        
-        return result
+        return self.api.controlnet(prompt=prompt, **self._image_kwargs(image_path, image_url), option=option, save_path=save_path, **kwargs)
 
 
 class Veo3(ModelBase):
@@ -357,12 +359,7 @@ class Veo3(ModelBase):
         Returns:
             bytes: The generated video data if save_path is None, otherwise the path where the video was saved.
         """
-        video_data = self.api.veo_3(prompt=prompt, seed=seed, **kwargs)
-        
-        if save_path:
-            return save_video(video_data, save_path)
-        
-        return video_data
+        return self.api.veo_3(prompt=prompt, seed=seed, save_path=save_path, **kwargs)
 
 
 class FluxKontextPro(ModelBase):
@@ -393,12 +390,10 @@ class FluxKontextPro(ModelBase):
             input_image=input_image,
             seed=seed,
             aspect_ratio=aspect_ratio,
+            save_path=save_path,
             **kwargs
         )
         
-        if save_path:
-            save_image(result, save_path)
-        
         return result
 
 
@@ -425,4 +420,41 @@ class LLaVA13B(ModelBase):
         Returns:
             dict: The model's response.
         """
-        return self.api.llava_13b(messages=messages)
\ No newline at end of file
+        return self.api.llava_13b(messages=messages)
+    
+    def generate_batch(self, conversations):
+        """
+        Generate answers for several independent prompts with a single API call.
+        
+        Args:
+            conversations (list): List of message lists, as accepted by generate.
+            
+        Returns:
+            list: The answer text for each conversation, in the same order.
+        """
+        return self.api.llava_13b_batch(conversations)
+
+
+async def batch_generate(model, kwargs_list):
+    """
+    Run several generations of a model concurrently.
+    
+    The calls share one session of the model's async client (aiohttp or httpx, see
+    async_transport), which is closed once all of them are done unless the model
+    is already open in an "async with model:" block.
+    From synchronous code, use asyncio.run(batch_generate(model, kwargs_list)).
+    
+    Args:
+        model (ModelBase): The model to generate with.
+        kwargs_list (list): The keyword arguments of each generate call.
+            Example: [{"prompt": "a cat"}, {"prompt": "a dog"}]
+        
+    Returns:
+        list: The results in the same order as kwargs_list.
+    """
+    import asyncio
+    
+    if model._async_api is not None:
+        return await asyncio.gather(*(model.agenerate(**kwargs) for kwargs in kwargs_list))
+    async with model:
+        return await asyncio.gather(*(model.agenerate(**kwargs) for kwargs in kwargs_list))
@@ -1,38 +1,211 @@
+import atexit
 import base64
 import io
+import mimetypes
 import os
-import requests
-from PIL import Image
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+
+# PIL and requests are imported where they are used, so that importing this
+# module (and segmind_models) stays cheap for callers that never touch images
+
+try:
+    import pybase64
+except ImportError:  # pybase64 is optional; fall back to the stdlib base64 module
+    pybase64 = None
+
+if pybase64 is not None:
+    # SIMD-accelerated encoder/decoder
+    _b64encode = pybase64.b64encode
+    _b64decode = pybase64.b64decode
+else:
+    _b64encode = base64.b64encode
+    _b64decode = base64.b64decode
+
+# Writes files in the background for save_image_async; pending writes are flushed at exit
+_IO_POOL = ThreadPoolExecutor(max_workers=4)
+atexit.register(_IO_POOL.shutdown)
+
+_pending_saves = set()
+_pending_saves_lock = threading.Lock()
+
+# (connect, read) timeouts in seconds for downloading source images
+_DOWNLOAD_TIMEOUT = (3, 30)
+
+# Keep-alive session shared by image downloads, created on first use
+_session = None
+
+# Number of times image downloads retry connection errors, rate limits and transient server errors
+_DOWNLOAD_RETRIES = 5
+
+# Chunk size for copying streamed video to disk
+_STREAM_CHUNK_SIZE = 1024 * 1024
+
+# Read size for streaming base64 encoding; a multiple of 3 so chunks encode independently
+_ENCODE_CHUNK_SIZE = 3 * 64 * 1024
+
+# Payloads at least this large are base64-encoded on several threads when pybase64
+# is installed; it releases the GIL while encoding, the stdlib encoder does not
+_PARALLEL_ENCODE_THRESHOLD = 4 * 1024 * 1024
+
+# Threads for parallel base64 encoding, created on first use
+_encode_pool = None
+
+# Large downscales first shrink by an integer factor with Image.reduce, then resample
+# the rest; at 3.0 the result is practically indistinguishable from a plain resize
+_REDUCING_GAP = 3.0
+
+# data: URL prefixes of the usual image_to_base64 formats, so they are not rebuilt per call
+_PREFIXES = {
+    "JPEG": b"data:image/jpeg;base64,",
+    "PNG": b"data:image/png;base64,",
+    "WEBP": b"data:image/webp;base64,",
+}
+
+# Image types that image_path_to_base64 uploads as they are; others are converted to JPEG
+_PASSTHROUGH_MIMES = frozenset(('image/jpeg', 'image/png', 'image/webp'))
+
+# Leading magic bytes of common image formats
+_IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'BM', 'image/bmp'),
+)
+
+def detect_image_mime(data, path=None):
+    """
+    Detect the MIME type of encoded image data from its magic bytes.
+    
+    Args:
+        data (bytes): The encoded image, or at least its first 12 bytes.
+        path (str, optional): A file name to guess the type from if the bytes are not recognized.
+        
+    Returns:
+        str: The MIME type (e.g. "image/png"), or None if it cannot be determined.
+    """
+    for signature, mime in _IMAGE_SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if path:
+        mime = mimetypes.guess_type(path)[0]
+        if mime and mime.startswith('image/'):
+            return mime
+    return None
+
+def _get_session():
+    """
+    Get the HTTP session shared by image downloads.
+    
+    Failed downloads are retried on the pooled connection with exponential
+    backoff, honoring Retry-After.
+    
+    Returns:
+        requests.Session: The session.
+    """
+    global _session
+    if _session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        retry = Retry(
+            total=_DOWNLOAD_RETRIES,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _session = session
+    return _session
 
 def load_image_from_url(url):
     """
     Load an image from a URL.
     
+    The body is handed to PIL straight from the connection, without first
+    being collected into a separate bytes object.
+    
     Args:
         url (str): The URL of the image.
         
     Returns:
         PIL.Image.Image: The loaded image.
     """
-    response = requests.get(url, stream=True)
-    if response.status_code == 200:
-        return Image.open(io.BytesIO(response.content))
-    else:
-        raise Exception(f"Failed to load image from URL: {url}. Status code: {response.status_code}")
+    from PIL import Image
+    
+    with _get_session().get(url, stream=True, timeout=_DOWNLOAD_TIMEOUT) as response:
+        if response.status_code != 200:
+            raise Exception(f"Failed to load image from URL: {url}. Status code: {response.status_code}")
+        # Undo any Content-Encoding (e.g. gzip) while reading
+        response.raw.decode_content = True
+        image = Image.open(response.raw)
+        # Decode before the connection is released back to the pool
+        image.load()
+    return image
 
-def load_image_from_path(path):
+def load_image_from_path(path, target_size=None):
     """
     Load an image from a file path.
     
     Args:
         path (str): The path to the image file.
+        target_size (tuple, optional): (width, height) the image is about to be downscaled to.
+            JPEGs are then decoded directly at a reduced scale that is still at least twice
+            this size, which is much faster than decoding at full resolution. Resize the
+            result to the exact size afterwards, e.g. with resize_image.
         
     Returns:
         PIL.Image.Image: The loaded image.
     """
-    if not os.path.exists(path):
+    from PIL import Image
+    
+    try:
+        image = Image.open(path)
+    except FileNotFoundError:
         raise FileNotFoundError(f"Image file not found: {path}")
-    return Image.open(path)
+    if target_size:
+        # Only has an effect on JPEGs; other formats ignore draft requests
+        image.draft(None, (target_size[0] * 2, target_size[1] * 2))
+    return image
+
+def _b64encode_parallel(data):
+    """
+    Base64-encode a large buffer by encoding slices of it on several threads.
+    
+    Every slice but the last is a multiple of 3 bytes long, so the encoded
+    slices concatenate to the encoding of the whole buffer.
+    
+    Args:
+        data (bytes or memoryview): The data to encode.
+        
+    Returns:
+        bytes: The base64-encoded data.
+    """
+    global _encode_pool
+    workers = os.cpu_count() or 1
+    if pybase64 is None or workers <= 2 or len(data) < _PARALLEL_ENCODE_THRESHOLD:
+        return _b64encode(data)
+    
+    if _encode_pool is None:
+        _encode_pool = ThreadPoolExecutor(max_workers=workers)
+    view = memoryview(data)
+    chunk = len(view) // workers // 3 * 3
+    futures = [_encode_pool.submit(_b64encode, view[i:i + chunk]) for i in range(0, len(view), chunk)]
+    try:
+        return b"".join(future.result() for future in futures)
+    finally:
+        view.release()
 
 def image_to_base64(image, format="JPEG"):
     """
@@ -47,8 +220,119 @@ def image_to_base64(image, format="JPEG"):
     """
     buffered = io.BytesIO()
     image.save(buffered, format=format)
-    img_str = base64.b64encode(buffered.getvalue()).decode("utf-8")
-    return f"data:image/{format.lower()};base64,{img_str}"
+    # Encode straight from the buffer instead of copying it out with getvalue()
+    view = buffered.getbuffer()
+    try:
+        encoded = _b64encode_parallel(view)
+    finally:
+        view.release()
+    prefix = _PREFIXES.get(format) or f"data:image/{format.lower()};base64,".encode("ascii")
+    # Join as bytes and decode once, rather than decoding and then formatting a new string
+    return (prefix + encoded).decode("ascii")
+
+def file_to_base64(path, mime=None):
+    """
+    Convert an already encoded image file to a base64 data URL without decoding it.
+    
+    The file is encoded in chunks straight into a preallocated buffer, so only
+    the encoded buffer and the final string are held in memory at once.
+    
+    Args:
+        path (str): The path to the image file.
+        mime (str, optional): The MIME type of the file. If None, it is detected from
+            the file contents, then from the file extension.
+        
+    Returns:
+        str: The base64-encoded image string.
+        
+    Raises:
+        ValueError: If mime is None and the file type cannot be determined.
+    """
+    with open(path, 'rb') as img_file:
+        size = os.fstat(img_file.fileno()).st_size
+        chunk = img_file.read(_ENCODE_CHUNK_SIZE)
+        mime = mime or detect_image_mime(chunk[:12], path)
+        if mime is None:
+            raise ValueError(f"Cannot determine the image type of {path}")
+        prefix = f"data:{mime};base64,".encode('ascii')
+        buffer = bytearray(len(prefix) + 4 * ((size + 2) // 3))
+        buffer[:len(prefix)] = prefix
+        pos = len(prefix)
+        while chunk:
+            encoded = _b64encode(chunk)
+            buffer[pos:pos + len(encoded)] = encoded
+            pos += len(encoded)
+            chunk = img_file.read(_ENCODE_CHUNK_SIZE)
+    # Guard against the file changing size while it was being read
+    del buffer[pos:]
+    return buffer.decode('ascii')
+
+@lru_cache(maxsize=32)
+def _encoded_for_path(path, mtime_ns, size, format):
+    """
+    Cached base64 encoding of an image file.
+    
+    The file's modification time and size are part of the cache key, so an
+    edited file is encoded again.
+    
+    Args:
+        path (str): The absolute path to the image file.
+        mtime_ns (int): The file's modification time in nanoseconds.
+        size (int): The file's size in bytes.
+        format (str): The image format to re-encode to, or None to keep the file's own encoding.
+        
+    Returns:
+        str: The base64-encoded image string.
+    """
+    if format is None:
+        with open(path, 'rb') as f:
+            mime = detect_image_mime(f.read(12))
+        if mime in _PASSTHROUGH_MIMES:
+            return file_to_base64(path, mime)
+        # Any other type (BMP, GIF, TIFF, ...) is converted by PIL and sent as JPEG
+        format = "JPEG"
+    return image_to_base64(load_image_from_path(path), format)
+
+def image_path_to_base64(path, format=None):
+    """
+    Convert an image file to a base64-encoded string, reusing the result for unchanged files.
+    
+    Args:
+        path (str): The path to the image file.
+        format (str, optional): The image format (JPEG, PNG, etc.) to re-encode to. If None,
+            JPEG, PNG and WebP files are encoded as they are, without a decode/encode round
+            trip, and other types are converted to JPEG.
+        
+    Returns:
+        str: The base64-encoded image string.
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Image file not found: {path}")
+    return _encoded_for_path(os.path.abspath(path), stat.st_mtime_ns, stat.st_size, format)
+
+def _upload_binary(path):
+    """
+    Read an image file for a binary (multipart/form-data) upload.
+    
+    Args:
+        path (str): The path to the image file.
+        
+    Returns:
+        bytes: The encoded image file contents, as stored on disk.
+    """
+    try:
+        with open(path, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"Image file not found: {path}")
+
+def clear_cache():
+    """
+    Clear the cache of encoded image files used by image_path_to_base64.
+    """
+    _encoded_for_path.cache_clear()
 
 def base64_to_image(base64_str):
     """
@@ -64,46 +348,147 @@ def base64_to_image(base64_str):
     if "," in base64_str:
         base64_str = base64_str.split(",", 1)[1]
     
-    img_data = base64.b64decode(base64_str)
+    from PIL import Image
+    
+    img_data = _b64decode(base64_str)
     return Image.open(io.BytesIO(img_data))
 
+def _create_parent_dir(path):
+    """
+    Create the parent directory of a file after writing it failed with FileNotFoundError.
+    
+    Directories are not checked up front, so repeated saves into an existing
+    directory cost no extra syscalls.
+    
+    Args:
+        path (str): The path of the file.
+        
+    Returns:
+        bool: True if there was a parent directory to create, False if the path has none.
+    """
+    parent = os.path.dirname(path)
+    if not parent:
+        return False
+    os.makedirs(parent, exist_ok=True)
+    return True
+
+def _open_for_write(path):
+    """
+    Open a file for binary writing, creating its parent directory only if it is missing.
+    
+    Args:
+        path (str): The path of the file.
+        
+    Returns:
+        file: The file, opened in 'wb' mode.
+    """
+    try:
+        return open(path, 'wb')
+    except FileNotFoundError:
+        if not _create_parent_dir(path):
+            raise
+        return open(path, 'wb')
+
 def save_image(image, path, format=None):
     """
-    Save a PIL Image to a file.
+    Save an image to a file.
     
     Args:
-        image (PIL.Image.Image): The image to save.
+        image (PIL.Image.Image or bytes): The image to save. Encoded image bytes
+            (e.g. from raw_bytes=True) that are already in the target format are written
+            as-is, without a decode/encode round trip; otherwise they are transcoded.
         path (str): The path where to save the image.
         format (str, optional): The image format. If None, it will be inferred from the file extension.
         
     Returns:
         str: The path where the image was saved.
     """
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    from PIL import Image
     
-    image.save(path, format=format)
+    # Load all format plugins; Image.MIME stays empty until they are registered
+    Image.init()
+    extension = os.path.splitext(path)[1].lower()
+    target = format.upper() if format else Image.registered_extensions().get(extension)
+    # Fail before the file is created, as Image.save does when given a path
+    if target is None:
+        raise ValueError(f"unknown file extension: {extension}")
+    if isinstance(image, (bytes, bytearray)):
+        target_mime = Image.MIME.get(target)
+        if target_mime is not None and target_mime == detect_image_mime(image[:12]):
+            # Already in the requested format: write the bytes verbatim
+            with _open_for_write(path) as f:
+                f.write(image)
+            return path
+        image = Image.open(io.BytesIO(image))
+    
+    # Saving to the path (rather than an open file) lets Pillow remove the file if encoding fails
+    try:
+        image.save(path, format=target)
+    except FileNotFoundError:
+        if not _create_parent_dir(path):
+            raise
+        image.save(path, format=target)
     return path
 
+def _save_done(future):
+    with _pending_saves_lock:
+        _pending_saves.discard(future)
+
+def save_image_async(image, path, format=None):
+    """
+    Save an image to a file on a background thread.
+    
+    Args:
+        image (PIL.Image.Image or bytes): The image to save, as accepted by save_image.
+            A PIL Image must not be modified until the save has finished.
+        path (str): The path where to save the image.
+        format (str, optional): The image format. If None, it will be inferred from the file extension.
+        
+    Returns:
+        concurrent.futures.Future: Resolves to the path where the image was saved.
+    """
+    future = _IO_POOL.submit(save_image, image, path, format)
+    with _pending_saves_lock:
+        _pending_saves.add(future)
+    future.add_done_callback(_save_done)
+    return future
+
+def wait_for_saves():
+    """
+    Wait for all pending save_image_async writes to finish.
+    
+    Raises:
+        Exception: The error of the first failed write, if any.
+    """
+    with _pending_saves_lock:
+        pending = list(_pending_saves)
+    for future in wait(pending).done:
+        future.result()
+
 def save_video(video_data, path):
     """
     Save video data to a file.
     
     Args:
-        video_data (bytes): The video data to save.
+        video_data (bytes, file or iterable): The video data to save. A binary file object
+            (e.g. a streamed response body) or an iterable of byte chunks is copied to disk
+            piece by piece, so the whole video never has to be held in memory.
         path (str): The path where to save the video.
         
     Returns:
         str: The path where the video was saved.
     """
-    # Create directory if it doesn't exist
-    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
-    
-    with open(path, 'wb') as f:
-        f.write(video_data)
+    with _open_for_write(path) as f:
+        if isinstance(video_data, (bytes, bytearray, memoryview)):
+            f.write(video_data)
+        elif hasattr(video_data, 'read'):
+            shutil.copyfileobj(video_data, f, length=_STREAM_CHUNK_SIZE)
+        else:
+            for chunk in video_data:
+                f.write(chunk)
     return path
 
-def resize_image(image, width=None, height=None, maintain_aspect=True):
+def resize_image(image, width=None, height=None, maintain_aspect=True, resample=None):
     """
     Resize an image to the specified dimensions.
     
@@ -112,6 +497,9 @@ def resize_image(image, width=None, height=None, maintain_aspect=True):
         width (int, optional): The target width.
         height (int, optional): The target height.
         maintain_aspect (bool, optional): Whether to maintain the aspect ratio.
+        resample (int, optional): The PIL resampling filter. Defaults to Image.LANCZOS, the
+            sharpest and slowest. When preparing an upload that the model resizes again anyway,
+            Image.BILINEAR is several times faster with no visible difference.
         
     Returns:
         PIL.Image.Image: The resized image.
@@ -119,6 +507,11 @@ def resize_image(image, width=None, height=None, maintain_aspect=True):
     if width is None and height is None:
         return image
     
+    from PIL import Image
+    
+    if resample is None:
+        resample = Image.LANCZOS
+    
     if maintain_aspect:
         if width is None:
             # Calculate width based on height while maintaining aspect ratio
@@ -142,6 +535,6 @@ def resize_image(image, width=None, height=None, maintain_aspect=True):
                 new_height = height
                 new_width = int(height * img_aspect)
             
-            return image.resize((new_width, new_height), Image.LANCZOS)
+            return image.resize((new_width, new_height), resample, reducing_gap=_REDUCING_GAP)
     
-    return image.resize((width, height), Image.LANCZOS)
\ No newline at end of file
+    return image.resize((width, height), resample, reducing_gap=_REDUCING_GAP)
\ No newline at end of file
@@ -8,8 +8,14 @@ setup(
     packages=find_packages(),
     install_requires=[
         "requests>=2.25.0",
+        "urllib3>=1.26.0",
         "Pillow>=8.0.0",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.7.0"],
+        "http2": ["httpx[http2]>=0.18.0"],
+        "fast": ["orjson>=3.0.0", "pybase64>=1.0.0"],
+    },
     python_requires=">=3.6",
     classifiers=[
         "Development Status :: 4 - Beta",
@@ -1,12 +1,26 @@
+import asyncio
+import base64
+import gzip
+import inspect
 import os
+import tempfile
+import threading
 import unittest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 from PIL import Image
+from urllib3.exceptions import ReadTimeoutError
 import io
+import json
 
 # Import the modules to test
-from segmind_api import SegmindAPI
-from segmind_models import SDXL, BackgroundRemoval, QRGenerator
+import segmind_utils
+from segmind_api import SegmindAPI, SegmindRateLimitError, LazyImage
+from segmind_models import SDXL, BackgroundRemoval, QRGenerator, batch_generate
+import segmind_async
+from segmind_async import AsyncSegmindAPI
+
+# aiohttp is an optional dependency
+requires_aiohttp = unittest.skipIf(segmind_async.aiohttp is None, "aiohttp is not installed")
 
 
 class TestSegmindAPI(unittest.TestCase):
@@ -14,7 +28,7 @@ class TestSegmindAPI(unittest.TestCase):
     
     def setUp(self):
         """Set up test fixtures."""
-        self.api_key = ""  # Test API key
+        self.api_key = "test_api_key"  # Test API key
         self.api = SegmindAPI(self.api_key)
     
     def test_init_with_api_key(self):
@@ -35,8 +49,8 @@ class TestSegmindAPI(unittest.TestCase):
             with self.assertRaises(ValueError):
                 SegmindAPI()
     
-    @patch('requests.post')
-    def test_text_to_image(self, mock_post):
+    @patch('requests.Session.send')
+    def test_text_to_image(self, mock_send):
         """Test text_to_image method."""
         # Create a mock response with an image
         mock_image = Image.new('RGB', (100, 100), color='red')
@@ -48,7 +62,7 @@ class TestSegmindAPI(unittest.TestCase):
         mock_response.status_code = 200
         mock_response.headers = {'Content-Type': 'image/jpeg'}
         mock_response.content = img_byte_arr
-        mock_post.return_value = mock_response
+        mock_send.return_value = mock_response
         
         # Call the method
         result = self.api.text_to_image('sdxl1.0', prompt="test prompt")
@@ -58,14 +72,15 @@ class TestSegmindAPI(unittest.TestCase):
         self.assertEqual(result.size, (100, 100))
         
         # Verify the API call
-        mock_post.assert_called_once_with(
-            "https://api.segmind.com/v1/sdxl1.0",
-            json={"prompt": "test prompt"},
-            headers=self.api.headers
-        )
+        mock_send.assert_called_once()
+        request = mock_send.call_args[0][0]
+        self.assertEqual(request.url, "https://api.segmind.com/v1/sdxl1.0")
+        self.assertEqual(request.body, b'{"prompt":"test prompt"}')
+        self.assertEqual(request.headers['x-api-key'], self.api_key)
+        self.assertEqual(mock_send.call_args[1]['timeout'], self.api.TIMEOUT)
     
-    @patch('requests.post')
-    def test_image_to_image(self, mock_post):
+    @patch('requests.Session.send')
+    def test_image_to_image(self, mock_send):
         """Test image_to_image method with image URL."""
         # Create a mock response with an image
         mock_image = Image.new('RGB', (100, 100), color='blue')
@@ -77,7 +92,7 @@ class TestSegmindAPI(unittest.TestCase):
         mock_response.status_code = 200
         mock_response.headers = {'Content-Type': 'image/jpeg'}
         mock_response.content = img_byte_arr
-        mock_post.return_value = mock_response
+        mock_send.return_value = mock_response
         
         # Call the method
         result = self.api.image_to_image(
@@ -90,19 +105,382 @@ class TestSegmindAPI(unittest.TestCase):
         self.assertEqual(result.size, (100, 100))
         
         # Verify the API call
-        mock_post.assert_called_once_with(
-            "https://api.segmind.com/v1/background-removal",
-            json={"image": "https://example.com/image.jpg"},
-            headers=self.api.headers
+        mock_send.assert_called_once()
+        request = mock_send.call_args[0][0]
+        self.assertEqual(request.url, "https://api.segmind.com/v1/background-removal")
+        self.assertEqual(request.body, b'{"image":"https://example.com/image.jpg"}')
+        self.assertEqual(request.headers['Content-Length'], str(len(request.body)))
+    
+    @patch('requests.Session.send')
+    def test_image_to_image_with_path(self, mock_send):
+        """Test image_to_image method with a local PNG file."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{"status": "ok"}'
+        mock_send.return_value = mock_response
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # Misleading extension: the MIME type must come from the file contents
+            image_path = os.path.join(tmp_dir, "input.jpg")
+            Image.new('RGB', (300, 200), color='blue').save(image_path, format='PNG')
+            with open(image_path, 'rb') as f:
+                raw = f.read()
+            
+            self.api.image_to_image('background-removal', image_path=image_path)
+            hits = segmind_utils._encoded_for_path.cache_info().hits
+            self.api.image_to_image('codeformer', image_path=image_path)
+            # The second upload of the unchanged file reuses the cached encoding
+            self.assertEqual(segmind_utils._encoded_for_path.cache_info().hits, hits + 1)
+        
+        sent = json.loads(mock_send.call_args[0][0].body)['image']
+        prefix, data = sent.split(',', 1)
+        self.assertEqual(prefix, "data:image/png;base64")
+        self.assertEqual(base64.b64decode(data), raw)
+    
+    @patch('requests.Session.send')
+    def test_image_to_image_multipart(self, mock_send):
+        """Test that image_bytes is uploaded as a binary multipart part."""
+        png = io.BytesIO()
+        Image.new('RGB', (10, 10), color='green').save(png, format='PNG')
+        png = png.getvalue()
+        
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'image/jpeg'}
+        mock_response.content = b'result'
+        mock_send.return_value = mock_response
+        
+        self.api.image_to_image('background-removal', image_bytes=png, raw_bytes=True, steps=20)
+        
+        request = mock_send.call_args[0][0]
+        self.assertTrue(request.headers['Content-Type'].startswith('multipart/form-data; boundary='))
+        self.assertIn(png, request.body)
+        self.assertIn(b'Content-Type: image/png', request.body)
+        self.assertIn(b'name="steps"\r\n\r\n20\r\n', request.body)
+        self.assertNotIn(b'base64', request.body)
+        self.assertEqual(request.headers['Content-Length'], str(len(request.body)))
+    
+    @patch('segmind_api.SegmindAPI.llava_13b')
+    def test_llava_13b_batch(self, mock_llava):
+        """Test that batched prompts are split by index tag, with per-item fallback."""
+        mock_llava.side_effect = [
+            {"choices": [{"message": {"content": "[1] Woof.\n[0] Meow.\nStill meowing."}}]},
+            {"choices": [{"message": {"content": "Tweet."}}]},
+        ]
+        conversations = [
+            [{"role": "user", "content": "what does a cat say?"}],
+            [{"role": "user", "content": "what does a dog say?"}],
+            [{"role": "user", "content": "what does a bird say?"}],
+        ]
+        
+        answers = self.api.llava_13b_batch(conversations)
+        
+        self.assertEqual(answers, ["Meow.\nStill meowing.", "Woof.", "Tweet."])
+        self.assertEqual(mock_llava.call_count, 2)
+        batched_prompt = mock_llava.call_args_list[0][0][0][0]['content']
+        self.assertIn("[2] what does a bird say?", batched_prompt)
+        mock_llava.assert_called_with(conversations[2])
+    
+    @patch('requests.Session.send')
+    def test_pipeline(self, mock_send):
+        """Test that pipeline passes an intermediate image on as raw bytes."""
+        png_bytes = io.BytesIO()
+        Image.new('RGB', (10, 10), color='red').save(png_bytes, format='PNG')
+        png_bytes = png_bytes.getvalue()
+        
+        first = MagicMock()
+        first.status_code = 200
+        # Media type parameters must not end up in the data URL
+        first.headers = {'Content-Type': 'image/png; charset=binary'}
+        first.content = png_bytes
+        second = MagicMock()
+        second.status_code = 200
+        second.headers = {'Content-Type': 'image/png'}
+        second.content = png_bytes
+        mock_send.side_effect = [first, second]
+        
+        result = self.api.pipeline([
+            {"model": "background-removal", "image_url": "https://example.com/image.jpg"},
+            {"model": "codeformer", "image_from": 0, "scale": 2},
+        ])
+        
+        self.assertIsInstance(result, Image.Image)
+        second_request = mock_send.call_args_list[1][0][0]
+        self.assertEqual(second_request.url, "https://api.segmind.com/v1/codeformer")
+        self.assertEqual(json.loads(second_request.body), {
+            "scale": 2,
+            "image": "data:image/png;base64," + base64.b64encode(png_bytes).decode('ascii'),
+        })
+    
+    def test_pipeline_without_steps(self):
+        """Test that an empty pipeline is rejected instead of returning None."""
+        with self.assertRaises(ValueError):
+            self.api.pipeline([])
+        with self.assertRaises(ValueError):
+            asyncio.run(AsyncSegmindAPI(self.api_key).pipeline([]))
+    
+    @patch('requests.Session.send')
+    def test_text_to_image_raw_bytes(self, mock_send):
+        """Test that raw_bytes returns the undecoded image bytes."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'image/jpeg'}
+        mock_response.content = b'\xff\xd8\xff encoded jpeg'
+        mock_send.return_value = mock_response
+        
+        result = self.api.sdxl("test prompt", raw_bytes=True)
+        
+        self.assertEqual(result, b'\xff\xd8\xff encoded jpeg')
+        self.assertNotIn('raw_bytes', json.loads(mock_send.call_args[0][0].body))
+    
+    @patch('requests.Session.send')
+    def test_veo_3_streams_to_file(self, mock_send):
+        """Test that veo_3 streams the video body to save_path."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.iter_content.return_value = iter([b'fake mp4 ', b'data'])
+        mock_response.__enter__.return_value = mock_response
+        mock_send.return_value = mock_response
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_path = os.path.join(tmp_dir, "videos", "out.mp4")
+            result = self.api.veo_3("a blooming flower", save_path=save_path)
+            
+            self.assertEqual(result, save_path)
+            with open(save_path, 'rb') as f:
+                self.assertEqual(f.read(), b'fake mp4 data')
+        
+        self.assertTrue(mock_send.call_args[1]['stream'])
+        # Video generation may take longer than the read timeout of other calls
+        self.assertEqual(mock_send.call_args[1]['timeout'], SegmindAPI.VIDEO_TIMEOUT)
+        self.assertIsNone(SegmindAPI.VIDEO_TIMEOUT[1])
+    
+    def test_httpx_transport(self):
+        """Test that the httpx transport sends requests through an HTTP/2 client."""
+        try:
+            import httpx
+        except ImportError:
+            self.skipTest("httpx is not installed")
+        
+        def handler(request):
+            self.assertEqual(request.headers['x-api-key'], self.api_key)
+            return httpx.Response(200, json={"answer": 42})
+        
+        with SegmindAPI(self.api_key, transport='httpx') as api:
+            api._session._client._transport = httpx.MockTransport(handler)
+            result = api.llava_13b([{"role": "user", "content": "hi"}])
+        
+        self.assertEqual(result, {"answer": 42})
+    
+    def test_retry_policy(self):
+        """Test that POST retries are configured on the connection pool."""
+        api = SegmindAPI(self.api_key, max_retries=3)
+        retry = api._session.get_adapter(api.BASE_URL).max_retries
+        self.assertEqual(retry.total, 3)
+        self.assertIn('POST', retry.allowed_methods)
+        self.assertIn(429, retry.status_forcelist)
+        self.assertTrue(retry.respect_retry_after_header)
+        # A POST that timed out while reading may still be generating, so it is not resent
+        with self.assertRaises(ReadTimeoutError):
+            retry.increment(method='POST', url='/v1/sdxl1.0-txt2img', error=ReadTimeoutError(None, '/v1/sdxl1.0-txt2img', 'timed out'))
+    
+    def test_invalid_transport(self):
+        """Test that an unknown transport is rejected."""
+        with self.assertRaises(ValueError):
+            SegmindAPI(self.api_key, transport='curl')
+    
+    @patch('requests.Session.send')
+    def test_compress_requests(self, mock_send):
+        """Test that large bodies are gzipped only when compression is enabled."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{}'
+        mock_send.return_value = mock_response
+        image_base64 = "data:image/png;base64," + "A" * 20000
+        
+        api = SegmindAPI(self.api_key, compress_requests=True)
+        api.background_removal(image_base64=image_base64)
+        api.llava_13b([{"role": "user", "content": "short"}])
+        
+        large_request, small_request = (call[0][0] for call in mock_send.call_args_list)
+        self.assertEqual(large_request.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(large_request.body))['image'], image_base64)
+        self.assertNotIn('Content-Encoding', small_request.headers)
+    
+    @patch('requests.Session.send')
+    def test_lazy_decode(self, mock_send):
+        """Test that lazy_decode returns a LazyImage delegating to the decoded image."""
+        img_byte_arr = io.BytesIO()
+        Image.new('RGB', (64, 32), color='red').save(img_byte_arr, format='PNG')
+        
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'image/png'}
+        mock_response.content = img_byte_arr.getvalue()
+        mock_send.return_value = mock_response
+        
+        with SegmindAPI(self.api_key, lazy_decode=True) as api:
+            result = api.sdxl("test prompt")
+            
+            self.assertIsInstance(result, LazyImage)
+            self.assertEqual(result.content, img_byte_arr.getvalue())
+            self.assertIsInstance(result.image, Image.Image)
+            self.assertEqual(result.size, (64, 32))
+        
+        # The client is still usable after the with block closed it
+        result = api.sdxl("test prompt")
+        self.assertIsInstance(result, LazyImage)
+        self.assertEqual(result.size, (64, 32))
+    
+    @patch('segmind_api.SegmindAPI.image_to_image')
+    def test_face_swap_renames_mask(self, mock_image_to_image):
+        """Test that the generated face_swap wrapper sends mask_url as mask."""
+        self.api.face_swap(image_url="https://example.com/face.jpg", mask_url="https://example.com/mask.jpg")
+        
+        mock_image_to_image.assert_called_once_with(
+            'face-swap',
+            image_url="https://example.com/face.jpg",
+            image_path=None,
+            image_base64=None,
+            image_bytes=None,
+            mask="https://example.com/mask.jpg"
         )
+        self.assertEqual(SegmindAPI.face_swap.__name__, 'face_swap')
     
-    @patch('requests.post')
-    def test_error_handling(self, mock_post):
+    @patch('segmind_api.SegmindAPI.image_to_image')
+    def test_image_model_positional_args(self, mock_image_to_image):
+        """Test that the generated wrappers keep prompt and mask_url as their fourth positional parameter."""
+        url = "https://example.com/face.jpg"
+        self.api.sd_outpainting(url, None, None, "a prompt")
+        mock_image_to_image.assert_called_with('sd-outpainting', image_url=url, image_path=None,
+                                               image_base64=None, image_bytes=None, prompt="a prompt")
+        
+        self.api.face_swap(url, None, None, "https://example.com/mask.jpg")
+        mock_image_to_image.assert_called_with('face-swap', image_url=url, image_path=None,
+                                               image_base64=None, image_bytes=None, mask="https://example.com/mask.jpg")
+        
+        self.api.background_removal(url, None, None, b'png')
+        mock_image_to_image.assert_called_with('background-removal', image_url=url, image_path=None,
+                                               image_base64=None, image_bytes=b'png')
+        
+        self.assertEqual(list(inspect.signature(SegmindAPI.word2img).parameters)[4:6], ['prompt', 'image_bytes'])
+        with self.assertRaises(TypeError):
+            self.api.word2img(url, None, None, "a prompt", prompt="another prompt")
+    
+    @patch('requests.Session.send')
+    def test_save_path_skips_transcode(self, mock_send):
+        """Test that matching formats are saved verbatim and others are transcoded."""
+        img_byte_arr = io.BytesIO()
+        Image.new('RGB', (40, 40), color='red').save(img_byte_arr, format='JPEG')
+        jpeg_bytes = img_byte_arr.getvalue()
+        
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'image/jpeg'}
+        mock_response.content = jpeg_bytes
+        mock_send.return_value = mock_response
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            jpeg_path = os.path.join(tmp_dir, "out.jpg")
+            png_path = os.path.join(tmp_dir, "out.png")
+            result = self.api.sdxl("test prompt", save_path=jpeg_path)
+            self.api.sdxl("test prompt", save_path=png_path)
+            
+            with open(jpeg_path, 'rb') as f:
+                self.assertEqual(f.read(), jpeg_bytes)
+            with Image.open(png_path) as saved:
+                self.assertEqual(saved.format, 'PNG')
+        
+        self.assertIsInstance(result, Image.Image)
+        self.assertNotIn('save_path', json.loads(mock_send.call_args[0][0].body))
+    
+    @patch('requests.Session.send')
+    def test_background_saves(self, mock_send):
+        """Test that background_saves writes save_path images off the calling thread."""
+        img_byte_arr = io.BytesIO()
+        Image.new('RGB', (40, 40), color='red').save(img_byte_arr, format='PNG')
+        
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'image/png'}
+        mock_response.content = img_byte_arr.getvalue()
+        mock_send.return_value = mock_response
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_path = os.path.join(tmp_dir, "out.png")
+            with patch('segmind_utils.save_image', wraps=segmind_utils.save_image) as mock_save:
+                with SegmindAPI(self.api_key, background_saves=True) as api:
+                    api.sdxl("test prompt", save_path=save_path, raw_bytes=True)
+                segmind_utils.wait_for_saves()
+            
+            mock_save.assert_called_once_with(img_byte_arr.getvalue(), save_path, None)
+            with open(save_path, 'rb') as f:
+                self.assertEqual(f.read(), img_byte_arr.getvalue())
+    
+    @patch('requests.Session.send')
+    def test_json_content_type_with_charset(self, mock_send):
+        """Test that JSON is parsed regardless of Content-Type parameters."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json; charset=utf-8'}
+        mock_response.content = b'{"status": "ok"}'
+        mock_send.return_value = mock_response
+        
+        self.assertEqual(self.api.llava_13b([{"role": "user", "content": "hi"}]), {"status": "ok"})
+    
+    @patch('requests.Session.send')
+    def test_response_cache(self, mock_send):
+        """Test that SEGMIND_CACHE=1 answers repeated requests from disk."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{"status": "ok"}'
+        mock_send.return_value = mock_response
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            with patch.dict(os.environ, {"SEGMIND_CACHE": "1", "SEGMIND_CACHE_DIR": tmp_dir}):
+                first = self.api.qr_generator(prompt="colorful", qr_text="https://example.com", seed=1)
+                second = self.api.qr_generator(qr_text="https://example.com", prompt="colorful", seed=1)
+                self.api.qr_generator(prompt="colorful", qr_text="https://example.com", seed=2)
+        
+        self.assertEqual(first, {"status": "ok"})
+        self.assertEqual(second, first)
+        self.assertEqual(mock_send.call_count, 2)
+    
+    @patch('requests.Session.send')
+    def test_prepared_request_reused(self, mock_send):
+        """Test that each endpoint's request is prepared once and copied per call."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{}'
+        mock_send.return_value = mock_response
+        
+        self.api.sdxl("first prompt")
+        self.api.sdxl("second prompt")
+        
+        first, second = (call[0][0] for call in mock_send.call_args_list)
+        self.assertEqual(len(self.api._prepared), 1)
+        self.assertIsNot(first, second)
+        self.assertIn(b"first prompt", first.body)
+        self.assertIn(b"second prompt", second.body)
+    
+    @patch('requests.Session.close')
+    def test_context_manager_closes_session(self, mock_close):
+        """Test that the client closes its session when used as a context manager."""
+        with SegmindAPI(self.api_key) as api:
+            self.assertEqual(api._session.headers['x-api-key'], self.api_key)
+        mock_close.assert_called_once_with()
+    
+    @patch('requests.Session.send')
+    def test_error_handling(self, mock_send):
         """Test error handling."""
         mock_response = MagicMock()
         mock_response.status_code = 401
-        mock_response.json.return_value = {"error": "Invalid API key"}
-        mock_post.return_value = mock_response
+        mock_response.content = b'{"error": "Invalid API key"}'
+        mock_send.return_value = mock_response
         
         # Call the method and expect an exception
         with self.assertRaises(Exception) as context:
@@ -110,6 +488,21 @@ class TestSegmindAPI(unittest.TestCase):
         
         # Verify the exception message
         self.assertIn("API request failed with status code 401: Invalid API key", str(context.exception))
+    
+    @patch('requests.Session.send')
+    def test_rate_limit_error(self, mock_send):
+        """Test that a 429 response raises SegmindRateLimitError with Retry-After."""
+        mock_response = MagicMock()
+        mock_response.status_code = 429
+        mock_response.headers = {'Retry-After': '7'}
+        mock_response.content = b'{"error": "Too many requests"}'
+        mock_send.return_value = mock_response
+        
+        with self.assertRaises(SegmindRateLimitError) as context:
+            self.api.text_to_image('sdxl1.0', prompt="test prompt")
+        
+        self.assertEqual(context.exception.retry_after, 7.0)
+        self.assertIn("429", str(context.exception))
 
 
 class TestModelClasses(unittest.TestCase):
@@ -139,12 +532,7 @@ class TestModelClasses(unittest.TestCase):
         self.assertEqual(result, mock_image)
         
         # Verify the API call
-        mock_sdxl.assert_called_once_with(
-            prompt="test prompt",
-            negative_prompt="bad quality",
-            steps=30,
-            seed=42
-        )
+        mock_sdxl.assert_called_once_with("test prompt", "bad quality", 30, 42, None, save_path=None)
     
     @patch('segmind_api.SegmindAPI.background_removal')
     def test_background_removal_model(self, mock_bg_removal):
@@ -162,9 +550,62 @@ class TestModelClasses(unittest.TestCase):
         
         # Verify the API call
         mock_bg_removal.assert_called_once_with(
-            image_url="https://example.com/image.jpg"
+            image_url="https://example.com/image.jpg",
+            save_path=None
         )
     
+    @patch('segmind_api.SegmindAPI.background_removal')
+    def test_background_removal_model_with_path(self, mock_bg_removal):
+        """Test that a local image is encoded once and reused while unchanged."""
+        segmind_utils.clear_cache()
+        model = BackgroundRemoval(self.api_key)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.png")
+            Image.new('RGB', (20, 20), color='white').save(image_path)
+            model.generate(image_path=image_path)
+            model.generate(image_path=image_path)
+        
+        first, second = mock_bg_removal.call_args_list
+        # The PNG file is sent as-is rather than re-encoded to JPEG
+        self.assertTrue(first[1]['image_base64'].startswith("data:image/png;base64,"))
+        self.assertEqual(first, second)
+        self.assertEqual(segmind_utils._encoded_for_path.cache_info().hits, 1)
+    
+    @patch('segmind_api.SegmindAPI.background_removal')
+    def test_background_removal_model_binary_upload(self, mock_bg_removal):
+        """Test that binary_upload sends the file bytes unchanged."""
+        model = BackgroundRemoval(self.api_key, binary_upload=True)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.png")
+            Image.new('RGB', (20, 20), color='white').save(image_path)
+            with open(image_path, 'rb') as f:
+                expected = f.read()
+            model.generate(image_path=image_path)
+        
+        mock_bg_removal.assert_called_once_with(image_bytes=expected, save_path=None)
+    
+    def test_models_share_api(self):
+        """Test that models can share one client and its connection pool."""
+        api = SegmindAPI(self.api_key)
+        sdxl = SDXL(api=api)
+        qr = QRGenerator(api=api)
+        
+        self.assertIs(sdxl.api, api)
+        self.assertIs(qr.api._session, sdxl.api._session)
+        adapter = api._session.get_adapter(api.BASE_URL)
+        self.assertEqual(adapter._pool_maxsize, SegmindAPI.POOL_MAXSIZE)
+    
+    def test_model_async_transport(self):
+        """Test that a model creates its async client on the chosen transport."""
+        api = SDXL(self.api_key, async_transport='httpx')._create_async_api()
+        
+        self.assertIsInstance(api, AsyncSegmindAPI)
+        self.assertEqual(api.transport, 'httpx')
+        self.assertEqual(api.api_key, self.api_key)
+        self.assertEqual(SDXL(self.api_key)._create_async_api().transport, 'aiohttp')
+    
     @patch('segmind_api.SegmindAPI.qr_generator')
     def test_qr_generator_model(self, mock_qr_generator):
         """Test QRGenerator model class."""
@@ -185,9 +626,382 @@ class TestModelClasses(unittest.TestCase):
         # Verify the API call
         mock_qr_generator.assert_called_once_with(
             prompt="colorful QR",
-            qr_text="https://example.com"
+            qr_text="https://example.com",
+            save_path=None
         )
 
 
+
+class TestUtils(unittest.TestCase):
+    """Test cases for the segmind_utils helpers."""
+    
+    @patch('requests.Session.get')
+    def test_load_image_from_url_streams(self, mock_get):
+        """Test that a downloaded image is decoded from the raw response stream."""
+        img_byte_arr = io.BytesIO()
+        Image.new('RGB', (30, 20), color='red').save(img_byte_arr, format='PNG')
+        img_byte_arr.seek(0)
+        
+        mock_response = MagicMock()
+        mock_response.__enter__.return_value = mock_response
+        mock_response.status_code = 200
+        mock_response.raw = img_byte_arr
+        mock_get.return_value = mock_response
+        
+        image = segmind_utils.load_image_from_url("https://example.com/image.png")
+        
+        self.assertEqual(image.size, (30, 20))
+        self.assertTrue(mock_response.raw.decode_content)
+        self.assertEqual(mock_get.call_args[1], {'stream': True, 'timeout': (3, 30)})
+        mock_response.__exit__.assert_called_once()
+    
+    def test_image_path_to_base64_converts_other_types(self):
+        """Test that only JPEG, PNG and WebP files are sent verbatim; others become JPEG."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            png_path = os.path.join(tmp_dir, "input.png")
+            bmp_path = os.path.join(tmp_dir, "input.bmp")
+            Image.new('RGB', (20, 20), color='white').save(png_path)
+            Image.new('RGB', (20, 20), color='white').save(bmp_path)
+            
+            self.assertTrue(segmind_utils.image_path_to_base64(png_path).startswith("data:image/png;base64,"))
+            encoded = segmind_utils.image_path_to_base64(bmp_path)
+        
+        self.assertTrue(encoded.startswith("data:image/jpeg;base64,"))
+        with Image.open(io.BytesIO(base64.b64decode(encoded.split(',', 1)[1]))) as image:
+            self.assertEqual(image.format, 'JPEG')
+    
+    def test_download_session_retries(self):
+        """Test that image downloads share a session that retries transient failures."""
+        session = segmind_utils._get_session()
+        retry = session.get_adapter("https://example.com/image.png").max_retries
+        
+        self.assertIs(segmind_utils._get_session(), session)
+        self.assertEqual(retry.total, segmind_utils._DOWNLOAD_RETRIES)
+        self.assertIn(503, retry.status_forcelist)
+        self.assertIn('GET', retry.allowed_methods)
+    
+    def test_load_image_from_path_target_size(self):
+        """Test that JPEGs are decoded at a reduced scale when a target size is given."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.jpg")
+            Image.new('RGB', (800, 600), color='blue').save(image_path)
+            
+            with segmind_utils.load_image_from_path(image_path, target_size=(100, 75)) as image:
+                self.assertEqual(image.size, (200, 150))
+            with self.assertRaises(FileNotFoundError):
+                segmind_utils.load_image_from_path(os.path.join(tmp_dir, "missing.jpg"))
+    
+    def test_resize_image_resample(self):
+        """Test that resize_image defaults to LANCZOS and accepts another filter."""
+        image = MagicMock(width=200, height=100)
+        
+        segmind_utils.resize_image(image, width=100)
+        image.resize.assert_called_with((100, 50), Image.LANCZOS, reducing_gap=3.0)
+        segmind_utils.resize_image(image, width=100, resample=Image.BILINEAR)
+        image.resize.assert_called_with((100, 50), Image.BILINEAR, reducing_gap=3.0)
+        segmind_utils.resize_image(image, width=100, height=100)
+        image.resize.assert_called_with((100, 50), Image.LANCZOS, reducing_gap=3.0)
+    
+    def test_save_image_creates_missing_directory_only(self):
+        """Test that save_image only creates the parent directory when it is missing."""
+        image = Image.new('RGB', (10, 10), color='red')
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            nested_path = os.path.join(tmp_dir, "a", "b", "out.png")
+            segmind_utils.save_image(image, nested_path)
+            with patch('os.makedirs') as mock_makedirs:
+                segmind_utils.save_image(image, os.path.join(tmp_dir, "a", "b", "again.png"))
+            
+            mock_makedirs.assert_not_called()
+            with Image.open(nested_path) as saved:
+                self.assertEqual(saved.format, 'PNG')
+            with self.assertRaises(ValueError):
+                segmind_utils.save_image(image, os.path.join(tmp_dir, "out.unknown"))
+            self.assertFalse(os.path.exists(os.path.join(tmp_dir, "out.unknown")))
+            # An encoder failure (RGBA cannot be saved as JPEG) must not leave an empty file behind
+            rgba_path = os.path.join(tmp_dir, "a", "b", "rgba.jpg")
+            with self.assertRaises(OSError):
+                segmind_utils.save_image(Image.new('RGBA', (10, 10)), rgba_path)
+            self.assertFalse(os.path.exists(rgba_path))
+    
+    def test_save_image_bytes_explicit_format(self):
+        """Test that bytes in another format are transcoded even before Pillow's plugins are loaded."""
+        png = io.BytesIO()
+        Image.new('RGB', (10, 10), color='red').save(png, format='PNG')
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "out.webp")
+            # Simulate a fresh process in which Image.MIME has not been populated yet
+            with patch.dict(Image.MIME, clear=True), patch.object(Image, '_initialized', 0):
+                segmind_utils.save_image(png.getvalue(), path, format="WEBP")
+            
+            with Image.open(path) as saved:
+                self.assertEqual(saved.format, 'WEBP')
+            with self.assertRaises(ValueError):
+                segmind_utils.save_image(png.getvalue(), os.path.join(tmp_dir, "out.unknown"))
+    
+    def test_save_video_from_stream(self):
+        """Test that save_video copies file objects and chunk iterables to disk."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            stream_path = segmind_utils.save_video(io.BytesIO(b'fake mp4 data'), os.path.join(tmp_dir, "a.mp4"))
+            chunks_path = segmind_utils.save_video(iter([b'fake mp4 ', b'data']), os.path.join(tmp_dir, "b.mp4"))
+            
+            for path in (stream_path, chunks_path):
+                with open(path, 'rb') as f:
+                    self.assertEqual(f.read(), b'fake mp4 data')
+    
+    @unittest.skipIf(segmind_utils.pybase64 is None, "pybase64 is not installed")
+    @patch('segmind_utils._PARALLEL_ENCODE_THRESHOLD', 1024)
+    @patch('os.cpu_count', return_value=4)
+    def test_parallel_base64(self, mock_cpu_count):
+        """Test that large images are base64-encoded in parallel slices without changing the output."""
+        image = Image.frombytes('RGB', (64, 64), os.urandom(64 * 64 * 3))
+        expected = io.BytesIO()
+        image.save(expected, format='PNG')
+        
+        encoded = segmind_utils.image_to_base64(image, format='PNG')
+        
+        self.assertEqual(encoded, "data:image/png;base64," + base64.b64encode(expected.getvalue()).decode('ascii'))
+        self.assertIsNotNone(segmind_utils._encode_pool)
+
+
+class TestAsyncSegmindAPI(unittest.TestCase):
+    """Test cases for the AsyncSegmindAPI class."""
+    
+    @requires_aiohttp
+    def test_gather(self):
+        """Test that gather runs model calls concurrently and keeps their order."""
+        mock_responses = []
+        for content in (b'{"id": 1}', b'{"id": 2}'):
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.headers = {'Content-Type': 'application/json'}
+            mock_response.content = content
+            mock_responses.append(mock_response)
+        
+        async def run():
+            async with AsyncSegmindAPI("test_api_key") as api:
+                with patch.object(api, '_post', AsyncMock(side_effect=mock_responses)) as mock_post:
+                    results = await api.gather([
+                        (api.sdxl, {"prompt": "a cat"}),
+                        (api.qr_generator, {"prompt": "colorful", "qr_text": "https://example.com"}),
+                    ])
+                    self.assertEqual(mock_post.await_count, 2)
+                    mock_post.assert_any_await(
+                        "https://api.segmind.com/v1/sdxl1.0-txt2img",
+                        {"prompt": "a cat", "base64": False},
+                        None
+                    )
+            return results
+        
+        self.assertEqual(asyncio.run(run()), [{"id": 1}, {"id": 2}])
+    
+    @requires_aiohttp
+    def test_reuse_after_close(self):
+        """Test that a client can be used again after its async with block closed it."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{"status": "ok"}'
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.png")
+            Image.new('RGB', (50, 50), color='green').save(image_path)
+            api = AsyncSegmindAPI("test_api_key")
+            
+            async def run():
+                results = []
+                for _ in range(2):
+                    async with api:
+                        with patch.object(api, '_post', AsyncMock(return_value=mock_response)):
+                            results.append(await api.background_removal(image_path=image_path))
+                return results
+            
+            self.assertEqual(asyncio.run(run()), [{"status": "ok"}, {"status": "ok"}])
+    
+    def test_sync_with_rejected(self):
+        """Test that using the async client in a plain with block fails loudly."""
+        api = AsyncSegmindAPI("test_api_key")
+        with self.assertRaises(TypeError):
+            with api:
+                pass
+    
+    @requires_aiohttp
+    def test_image_to_image_with_path(self):
+        """Test that a local image is encoded off the event loop and sent as a data URL."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{"status": "ok"}'
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.png")
+            Image.new('RGB', (50, 50), color='green').save(image_path)
+            
+            async def run():
+                async with AsyncSegmindAPI("test_api_key") as api:
+                    with patch.object(api, '_post', AsyncMock(return_value=mock_response)) as mock_post:
+                        await api.background_removal(image_path=image_path)
+                return mock_post.await_args[0][1]
+            
+            sent = asyncio.run(run())
+        
+        self.assertTrue(sent['image'].startswith("data:image/png;base64,"))
+    
+    @requires_aiohttp
+    def test_batch_generate(self):
+        """Test that batch_generate runs model generations concurrently and closes the session."""
+        mock_responses = []
+        for content in (b'{"id": 1}', b'{"id": 2}'):
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.headers = {'Content-Type': 'application/json'}
+            mock_response.content = content
+            mock_responses.append(mock_response)
+        
+        model = QRGenerator("test_api_key")
+        with patch.object(AsyncSegmindAPI, '_post', AsyncMock(side_effect=mock_responses)) as mock_post:
+            results = asyncio.run(batch_generate(model, [
+                {"prompt": "colorful", "qr_text": "https://example.com/1"},
+                {"prompt": "colorful", "qr_text": "https://example.com/2"},
+            ]))
+        
+        self.assertEqual(results, [{"id": 1}, {"id": 2}])
+        self.assertEqual(mock_post.await_count, 2)
+        self.assertIsNone(model._async_api)
+    
+    @requires_aiohttp
+    def test_agenerate_repeated_event_loops(self):
+        """Test that agenerate works from successive event loops and closes each session."""
+        sessions = []
+        
+        async def fake_post(api, url, params, files=None):
+            sessions.append(api._get_session())
+            mock_response = MagicMock()
+            mock_response.status_code = 200
+            mock_response.headers = {'Content-Type': 'application/json'}
+            mock_response.content = b'{"status": "ok"}'
+            return mock_response
+        
+        model = QRGenerator("test_api_key")
+        with patch.object(AsyncSegmindAPI, '_post', fake_post):
+            first = asyncio.run(model.agenerate(prompt="colorful", qr_text="https://example.com/1"))
+            second = asyncio.run(model.agenerate(prompt="colorful", qr_text="https://example.com/2"))
+        
+        self.assertEqual(first, {"status": "ok"})
+        self.assertEqual(second, {"status": "ok"})
+        self.assertEqual(len(sessions), 2)
+        self.assertIsNot(sessions[0], sessions[1])
+        self.assertTrue(all(session.closed for session in sessions))
+        self.assertIsNone(model._async_api)
+    
+    @requires_aiohttp
+    def test_agenerate_with_path(self):
+        """Test that agenerate leaves encoding a local image to the async client's worker pool."""
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'application/json'}
+        mock_response.content = b'{"status": "ok"}'
+        encode_threads = []
+        
+        def record_thread(path, format=None):
+            encode_threads.append(threading.get_ident())
+            return segmind_utils.image_path_to_base64(path, format)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.png")
+            Image.new('RGB', (50, 50), color='green').save(image_path)
+            
+            async def run():
+                async with BackgroundRemoval("test_api_key") as model:
+                    await model.agenerate(image_path=image_path)
+                return threading.get_ident()
+            
+            with patch.object(AsyncSegmindAPI, '_post', AsyncMock(return_value=mock_response)) as mock_post, \
+                 patch('segmind_api.image_path_to_base64', side_effect=record_thread), \
+                 patch('segmind_models.image_path_to_base64') as mock_sync_encode:
+                loop_thread = asyncio.run(run())
+        
+        mock_sync_encode.assert_not_called()
+        self.assertEqual(len(encode_threads), 1)
+        self.assertNotEqual(encode_threads[0], loop_thread)
+        self.assertTrue(mock_post.await_args[0][1]['image'].startswith("data:image/png;base64,"))
+    
+    @requires_aiohttp
+    def test_agenerate_binary_upload_and_save(self):
+        """Test that agenerate reads binary uploads and saves results off the event loop, with the model's settings."""
+        png = io.BytesIO()
+        Image.new('RGB', (20, 20), color='red').save(png, format='PNG')
+        mock_response = MagicMock()
+        mock_response.status_code = 200
+        mock_response.headers = {'Content-Type': 'image/png'}
+        mock_response.content = png.getvalue()
+        io_threads = []
+        
+        def record_read(path):
+            io_threads.append(threading.get_ident())
+            return segmind_utils._upload_binary(path)
+        
+        def record_save(image, path):
+            io_threads.append(threading.get_ident())
+            return segmind_utils.save_image(image, path)
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            image_path = os.path.join(tmp_dir, "input.png")
+            save_path = os.path.join(tmp_dir, "output.png")
+            Image.new('RGB', (50, 50), color='green').save(image_path)
+            with open(image_path, 'rb') as f:
+                raw = f.read()
+            model = BackgroundRemoval(api=SegmindAPI("test_api_key", lazy_decode=True), binary_upload=True)
+            
+            async def run():
+                result = await model.agenerate(image_path=image_path, save_path=save_path)
+                return result, threading.get_ident()
+            
+            with patch.object(AsyncSegmindAPI, '_post', AsyncMock(return_value=mock_response)) as mock_post, \
+                 patch('segmind_api._upload_binary', side_effect=record_read), \
+                 patch('segmind_api.save_image', side_effect=record_save), \
+                 patch('segmind_models._upload_binary') as mock_sync_read:
+                result, loop_thread = asyncio.run(run())
+            
+            self.assertTrue(os.path.exists(save_path))
+        
+        mock_sync_read.assert_not_called()
+        self.assertEqual(mock_post.await_args[0][2], {'image': raw})
+        self.assertEqual(len(io_threads), 2)
+        self.assertNotIn(loop_thread, io_threads)
+        self.assertIsInstance(result, LazyImage)
+    
+    def test_httpx_transport(self):
+        """Test that the httpx transport sends requests and streams videos through an HTTP/2 client."""
+        try:
+            import httpx
+        except ImportError:
+            self.skipTest("httpx is not installed")
+        
+        def handler(request):
+            self.assertEqual(request.headers['x-api-key'], "test_api_key")
+            if request.url.path.endswith('veo-3'):
+                return httpx.Response(200, content=b'fake mp4 data')
+            return httpx.Response(200, json={"answer": 42})
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            save_path = os.path.join(tmp_dir, "out.mp4")
+            
+            async def run():
+                async with AsyncSegmindAPI("test_api_key", transport='httpx') as api:
+                    self.assertIsInstance(api._async_session, httpx.AsyncClient)
+                    api._async_session._transport = httpx.MockTransport(handler)
+                    return await api.gather([
+                        (api.llava_13b, {"messages": [{"role": "user", "content": "hi"}]}),
+                        (api.veo_3, {"prompt": "a blooming flower", "save_path": save_path}),
+                    ])
+            
+            results = asyncio.run(run())
+            with open(save_path, 'rb') as f:
+                self.assertEqual(f.read(), b'fake mp4 data')
+        
+        self.assertEqual(results, [{"answer": 42}, save_path])
+
+
 if __name__ == '__main__':
     unittest.main()